@@ -0,0 +1,50 @@
+"""Compare load and dump throughput of the JSON codecs on the real docs/data files.
+
+Run from the repo root: python benchmarks/bench_codec.py [--repeat N]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import codec
+from config import DB_FILES
+
+def time_it(func, repeat):
+    """Return the best wall time of func over repeat runs."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"orjson available: {codec.orjson is not None}")
+    for region, filepath in DB_FILES.items():
+        with open(filepath, 'rb') as file:
+            raw = file.read()
+        db = json.loads(raw)
+        size_mb = len(raw) / 1e6
+
+        cases = {
+            'load  stdlib json.loads': lambda: json.loads(raw),
+            'load  codec.loads': lambda: codec.loads(raw),
+            'dump  stdlib indent=4, default=str': lambda: json.dumps(db, indent=4, default=str).encode('utf-8'),
+            'dump  codec pretty': lambda: codec.dumps(db, pretty=True),
+            'dump  codec compact': lambda: codec.dumps(db, pretty=False),
+        }
+        print(f"\n{filepath} ({size_mb:.2f} MB, compact output {len(codec.dumps(db, pretty=False)) / 1e6:.2f} MB)")
+        for name, func in cases.items():
+            elapsed = time_it(func, args.repeat)
+            print(f"  {name:<40} {elapsed * 1000:8.2f} ms  {size_mb / elapsed:8.1f} MB/s")
+
+if __name__ == '__main__':
+    main()
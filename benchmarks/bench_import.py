@@ -0,0 +1,68 @@
+"""Check the import cost of main.py against a budget, as a regression check for lazy imports.
+
+Runs `python -X importtime -c "import main"` in fresh interpreters and reports the cumulative import
+time of main (best of N runs) and the modules that take longest. It also checks that importing main
+doesn't load pandas, numpy, bs4 or any scraper module, and that selecting one venue only imports
+that venue's scraper. Exits with status 1 if the budget is exceeded or a check fails.
+
+Run from the repo root: python benchmarks/bench_import.py [--budget-ms 300] [--repeat N] [--top N]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that importing main must not load
+DEFERRED = ['pandas', 'numpy', 'bs4']
+
+CHECK_MODULES = """
+import sys, main
+print(','.join(sorted(m for m in sys.modules if m.split('.')[0] in {deferred!r} or m.startswith('scrapers.'))))
+main.get_venue_scrapers(selected_venues=['Kala Art Institute'])
+print(','.join(sorted(m for m in sys.modules if m.startswith('scrapers.') and m != 'scrapers.sf')))
+"""
+
+def import_times():
+    """Return {module: (self us, cumulative us)} for one `import main` in a fresh interpreter."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--budget-ms', type=float, default=300)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    runs = [import_times() for _ in range(args.repeat)]
+    best = min(runs, key=lambda times: times['main'][1])
+    total_ms = best['main'][1] / 1000
+    print(f"import main: {total_ms:.1f} ms (best of {args.repeat}, budget {args.budget_ms:.0f} ms)")
+    for name, (self_us, cumulative_us) in sorted(best.items(), key=lambda item: -item[1][0])[:args.top]:
+        print(f"  {name:<40} self {self_us / 1000:7.1f} ms  cumulative {cumulative_us / 1000:7.1f} ms")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"import main took {total_ms:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+    output = subprocess.run([sys.executable, '-c', CHECK_MODULES.format(deferred=set(DEFERRED))],
+                            cwd=ROOT, capture_output=True, text=True, check=True).stdout.splitlines()
+    if output[0]:
+        failures.append(f"import main loaded {output[0]}")
+    if output[1] != 'scrapers.sf.kala':
+        failures.append(f"selecting Kala Art Institute imported {output[1]}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
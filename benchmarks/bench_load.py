@@ -0,0 +1,71 @@
+"""Compare time and peak memory of loading a db file with the old NaN post-walk and with the codec.
+
+The old path is json.load followed by a recursive copy of the whole tree that calls np.isnan on
+every float; the codec maps NaN to None while decoding, in a single pass.
+
+Run from the repo root: python benchmarks/bench_load.py [--file docs/data/sf_events.json] [--repeat N]
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import codec
+
+def convert_nan_to_none(data):
+    """The recursive post-walk load_db used to run after every json.load."""
+    if isinstance(data, dict):
+        return {k: convert_nan_to_none(v) for k, v in data.items()}
+    elif isinstance(data, list):
+        return [convert_nan_to_none(i) for i in data]
+    elif isinstance(data, float) and math.isnan(data):
+        return None
+    else:
+        return data
+
+def old_load(filepath):
+    with open(filepath, 'r') as file:
+        return convert_nan_to_none(json.load(file))
+
+def stdlib_load(filepath):
+    with open(filepath, 'rb') as file:
+        return json.loads(file.read(), parse_constant=codec._parse_constant)
+
+def measure(func, filepath, repeat):
+    """Return (best wall time in seconds, peak traced memory in bytes)."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(filepath)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    func(filepath)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--file', default='docs/data/sf_events.json')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    cases = {
+        'json.load + NaN post-walk (old)': old_load,
+        'json.loads + parse_constant': stdlib_load,
+        f"codec.load (orjson={'yes' if codec.orjson else 'no'})": codec.load,
+    }
+    assert old_load(args.file) == codec.load(args.file), "loaders disagree"
+
+    print(f"{args.file} ({os.path.getsize(args.file) / 1e6:.2f} MB)")
+    for name, func in cases.items():
+        elapsed, peak = measure(func, args.file, args.repeat)
+        print(f"  {name:<36} {elapsed * 1000:8.2f} ms  peak {peak / 1e6:6.2f} MB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Compare parse time and peak memory of building the whole tree vs only the region a scraper reads.
+
+Pages come from an archive recorded with main(record=...):
+
+    python benchmarks/bench_parse_only.py pages.zip [--parser html.parser] [--repeat N]
+
+Each page with a parse_only region declared by its scraper is parsed in full and with the region's
+SoupStrainer, and the number of elements in both trees is reported alongside time and memory.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+import codec
+from scrapers.sf import sfmoma, asian_art_museum
+from scrapers.la import lacma
+
+REGIONS = {
+    'https://www.sfmoma.org/exhibitions/': sfmoma.EXHIBITIONS_REGION,
+    'https://www.lacma.org/currentexhibitions': lacma.EXHIBITION_LIST_REGION,
+    'https://www.lacma.org/upcomingexhibitions': lacma.EXHIBITION_LIST_REGION,
+    'https://www.lacma.org/pastexhibitions': lacma.EXHIBITION_LIST_REGION,
+    'https://exhibitions.asianart.org/past/': asian_art_museum.PAST_REGION,
+}
+
+def measure(content, parser, parse_only, repeat):
+    """Return (best wall time in seconds, peak traced memory in bytes, number of tags in the tree)."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        BeautifulSoup(content, parser, parse_only=parse_only)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    soup = BeautifulSoup(content, parser, parse_only=parse_only)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, len(soup.find_all(True))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('archive', help='zip archive recorded with main(record=...)')
+    parser.add_argument('--parser', default='html.parser')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with zipfile.ZipFile(args.archive) as archive:
+        index = codec.loads(archive.read('index.json'))
+        for url, region in REGIONS.items():
+            entry = index.get(url)
+            if not entry or 'file' not in entry:
+                print(f"{url}: not in the archive")
+                continue
+            content = archive.read(entry['file'])
+            full_time, full_peak, full_tags = measure(content, args.parser, None, args.repeat)
+            part_time, part_peak, part_tags = measure(content, args.parser, region, args.repeat)
+            print(url)
+            print(f"  full tree    {full_time * 1000:8.1f} ms  {full_peak / 1024 / 1024:7.1f} MB  {full_tags:6} tags")
+            print(f"  parse_only   {part_time * 1000:8.1f} ms  {part_peak / 1024 / 1024:7.1f} MB  {part_tags:6} tags"
+                  f"  ({full_time / part_time:.1f}x faster)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Compare BeautifulSoup tree builders on recorded pages: parse time, and whether scrapers extract the same events.
+
+Record a run first (python main.py --record pages.zip), then:
+
+    python benchmarks/bench_parsers.py pages.zip [--parsers html.parser lxml] [--repeat N]
+
+Parse time is the best of N parses of every page in the archive. For the equivalence check every
+scraper is re-run in replay mode under each parser, and the events it yields are compared with
+those extracted using the first parser. The check fails (exit status 1) if any venue differs, if
+a scraper fails or a page is missing from the archive under any parser, or if no events were
+extracted at all, since then nothing was actually compared.
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import time
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+import codec
+import utils
+from config import VOLATILE_FIELDS
+from main import get_venue_scrapers
+
+def load_pages(archive_path):
+    """Return the content of every recorded page in the archive."""
+    with zipfile.ZipFile(archive_path) as archive:
+        index = codec.loads(archive.read('index.json'))
+        return [archive.read(entry['file']) for entry in index.values() if 'file' in entry]
+
+def time_parser(pages, parser, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for content in pages:
+            BeautifulSoup(content, parser)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def extract_events(archive_path, parser):
+    """Run every scraper against the archive with the given parser.
+
+    Returns ({venue: [event_details]}, [failures]), where failures describe scrapers that raised
+    and pages the archive was missing.
+    """
+    venues, _ = get_venue_scrapers()
+    events = {}
+    failures = []
+    utils.set_html_parser(parser)
+    utils.open_archive(archive_path, 'replay')
+    try:
+        for venue, scrapers in venues.items():
+            events[venue] = []
+            for scraper in scrapers if isinstance(scrapers, list) else [scrapers]:
+                try:
+                    with utils.venue_context(venue):
+                        # Leave out last_updated, it differs between any two runs
+                        events[venue].extend({k: v for k, v in event_details.items() if k not in VOLATILE_FIELDS}
+                                             for event_details in scraper())
+                except Exception as e:
+                    failures.append(f"{venue}: scraper failed with {parser}: {e}")
+    finally:
+        try:
+            utils.close_archive()
+        except utils.ReplayMissError as e:
+            failures.append(f"{parser}: {e}")
+    return events, failures
+
+def main():
+    available = [name for name, module in [('html.parser', None), ('lxml', 'lxml'), ('html5lib', 'html5lib')]
+                 if module is None or importlib.util.find_spec(module)]
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('archive', help='zip archive recorded with main(record=...)')
+    parser.add_argument('--parsers', nargs='+', default=available)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    pages = load_pages(args.archive)
+    size = sum(len(content) for content in pages)
+    print(f"{len(pages)} pages, {size / 1024 / 1024:.1f} MB")
+    baseline_time = None
+    for name in args.parsers:
+        elapsed = time_parser(pages, name, args.repeat)
+        baseline_time = baseline_time or elapsed
+        print(f"{name:<12} {elapsed * 1000:9.1f} ms  {baseline_time / elapsed:5.2f}x")
+
+    baseline, failures = extract_events(args.archive, args.parsers[0])
+    if not any(baseline.values()):
+        failures.append(f"no events extracted with {args.parsers[0]}, nothing to compare")
+    differ = False
+    for name in args.parsers[1:]:
+        events, parser_failures = extract_events(args.archive, name)
+        failures += parser_failures
+        differing = [venue for venue in baseline if events.get(venue) != baseline[venue]]
+        for venue in differing:
+            print(f"  {venue}: {len(baseline[venue])} events with {args.parsers[0]}, "
+                  f"{len(events.get(venue, []))} with {name}, contents differ")
+        differ = differ or bool(differing)
+        status = 'identical' if not differing else f"{len(differing)} venues differ"
+        print(f"{name} vs {args.parsers[0]}: {sum(len(v) for v in events.values())} events, {status}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures or differ else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+import json
+import datetime as dt
+
+# orjson is much faster than the stdlib json module but optional, fall back to json when it isn't installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _default(obj):
+    """Serialize values the stdlib encoder doesn't handle (orjson handles dates itself)."""
+    if isinstance(obj, (dt.date, dt.datetime)):
+        return obj.isoformat()
+    return str(obj)
+
+def _parse_constant(name):
+    """Decode NaN, Infinity and -Infinity (written by pandas in older dbs) as None."""
+    return None
+
+def loads(data):
+    """Decode JSON from bytes or str, with NaN/Infinity decoded as None."""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson rejects NaN/Infinity, let the stdlib decoder map them to None
+            pass
+    return json.loads(data, parse_constant=_parse_constant)
+
+def dumps(obj, pretty=True):
+    """Encode an object as UTF-8 JSON bytes.
+
+    pretty=True gives the 4-space indented, ASCII-escaped layout the db files have always used, so
+    diffs stay readable and unchanged dbs stay byte-identical. orjson only supports 2-space
+    indentation, so pretty output always goes through the stdlib encoder. pretty=False gives
+    compact output (no whitespace, raw UTF-8) and uses orjson when available.
+    """
+    if pretty:
+        return json.dumps(obj, indent=4, default=_default).encode('utf-8')
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False, default=_default).encode('utf-8')
+
+def load(filepath):
+    """Read and decode a JSON file."""
+    with open(filepath, 'rb') as file:
+        return loads(file.read())
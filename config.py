@@ -5,6 +5,102 @@ DB_FILES = {
     'sf': 'docs/data/sf_events.json',
     'la': 'docs/data/la_events.json',
 }
+# 'monolithic' keeps each region in one DB_FILES file; 'sharded' keeps one file per venue in SHARD_DIRS plus a
+# manifest.json, so only the venues that changed are rewritten. With SHARD_EXPORT_MONOLITHIC the DB_FILES file
+# is still regenerated from the shards for the frontend, once at the end of a run that changed any shard
+DB_LAYOUT = 'monolithic'
+SHARD_DIRS = {
+    'sf': 'docs/data/sf',
+    'la': 'docs/data/la',
+}
+SHARD_EXPORT_MONOLITHIC = True
+# Write the db files without indentation (smaller and faster for the frontend) instead of the
+# 4-space indented layout that is easier to review in diffs
+DB_JSON_COMPACT = False
+# Persistence backend for the run-scoped event store: 'json' (DB_FILES only) or 'sqlite' (SQLITE_DB_FILES,
+# exported back to DB_FILES for the static site on every flush)
+DB_BACKEND = 'json'
+SQLITE_DB_FILES = {
+    'sf': 'data/sf_events.sqlite',
+    'la': 'data/la_events.sqlite',
+}
+# Append event upserts to docs/data/{region}_events.journal.jsonl instead of rewriting the JSON snapshot.
+# load_db replays the journal on top of the snapshot. Checkpoints during a run only compact the journal into
+# the snapshot once it passes either threshold below; closing the run's store always compacts it
+DB_JOURNAL = False
+JOURNAL_COMPACT_ENTRIES = 500
+JOURNAL_COMPACT_BYTES = 512 * 1024
+# Flush the run-scoped event store to disk after this many writes (None = only at the end of the run)
+STORE_CHECKPOINT_EVERY = None
+# Fields that make up an event's content fingerprint; anything else is ignored when deciding if an event changed
+FINGERPRINT_FIELDS = ['name', 'dates', 'description', 'links', 'phase', 'tags', 'ongoing']
+# Fields that change on every scrape (or are derived) and must never feed into the fingerprint
+VOLATILE_FIELDS = ['last_updated', 'hash']
+# HTTP client settings shared by every scraper through utils.fetch_and_parse
+USER_AGENT = 'ArtBasilBot/1.0 (+https://artbasil.info)'
+HTTP_TIMEOUT = (5, 30)  # (connect, read) seconds
+HTTP_POOL_CONNECTIONS = 32  # number of per-host connection pools kept alive
+HTTP_POOL_MAXSIZE = 4  # keep-alive connections per host
+# Politeness limits applied to every request to the same host, and the worker count for utils.fetch_many
+HOST_MAX_CONCURRENCY = 2  # requests in flight per host
+HOST_RATE = 2.0  # sustained requests per second per host (token bucket refill rate)
+HOST_BURST = 2  # requests a host can receive back to back before the rate applies
+HONOR_CRAWL_DELAY = True  # lower a host's rate to the Crawl-delay in its robots.txt
+RETRY_AFTER_MAX_S = 300  # longest Retry-After pause (seconds) honored after a 429/503
+FETCH_MAX_WORKERS = 8
+# Transient fetch errors (connection errors, timeouts and these status codes) are retried with jittered
+# exponential backoff: a random delay between half and all of min(base * 2**attempt, max)
+HTTP_RETRIES = 3
+HTTP_RETRY_STATUSES = (429, 500, 502, 503, 504)
+HTTP_BACKOFF_BASE_S = 1.0
+HTTP_BACKOFF_MAX_S = 30.0
+# Stop fetching for a venue after this many consecutive failed fetches, trying again after the cooldown
+CIRCUIT_BREAKER_THRESHOLD = 5
+CIRCUIT_BREAKER_COOLDOWN_S = 300
+# On-disk store of response bodies and their ETag/Last-Modified validators, used to send conditional
+# requests (None disables it), in one subdirectory per environment. Kept between GitHub Actions runs with
+# actions/cache
+HTTP_CACHE_DIR = '.cache/http'
+# How long (seconds) a cached page is served without contacting the site at all, per environment. Dev runs
+# reuse pages for a few hours so parser fixes can be iterated on locally; prod always revalidates
+HTTP_CACHE_TTL = {
+    'dev': 6 * 60 * 60,
+    'prod': 0,
+}
+# Least recently used pages are evicted once the cached bodies pass this size
+HTTP_CACHE_MAX_BYTES = 200 * 1024 * 1024
+# Hashes of the page fragments scrapers extract events from; unchanged fragments are skipped,
+# but each one is still fully processed at least every FRAGMENT_REFRESH_DAYS days
+FRAGMENT_STORE_FILE = '.cache/fragments.json'
+FRAGMENT_REFRESH_DAYS = 7
+# Pages of these phases are checked less often the less often their fragment has changed: every day,
+# week or month (SCHEDULE_TIERS_DAYS), picking the longest tier not above the days per change seen so far
+SCHEDULE_ADAPTIVE_PHASES = ('past',)
+SCHEDULE_TIERS_DAYS = (1, 7, 30)
+# Fields extracted from event detail pages, reused while the event's listing card is unchanged and the
+# entry is younger than the TTL for its phase (None covers events without a phase)
+DETAIL_CACHE_FILE = '.cache/details.json'
+DETAIL_CACHE_TTL_DAYS = {
+    'current': 1,
+    'future': 1,
+    'past': 30,
+    None: 1,
+}
+# Wall time of each venue's recent runs, used to start the longest venues first when scraping concurrently
+VENUE_TIMINGS_FILE = '.cache/venue_timings.json'
+VENUE_TIMINGS_HISTORY = 5
+# BeautifulSoup tree builder. html.parser is the default so every machine parses pages the same way as CI;
+# 'lxml' (or 'auto', lxml when installed) is opt-in, once benchmarks/bench_parsers.py shows the scrapers
+# extract identical events with it and lxml is added to requirements.txt. Venues whose scrapers depend on
+# one builder's handling of broken markup can be pinned in HTML_PARSER_OVERRIDES
+HTML_PARSER = 'html.parser'
+HTML_PARSER_OVERRIDES = {}
+# Per-host overrides of HTTP_POOL_MAXSIZE for sites with many detail pages
+HTTP_HOST_POOL_SIZES = {
+    'www.thebroad.org': 6,
+    'museumca.org': 6,
+    'www.sfwomenartists.org': 6,
+}
 MONTH_TO_NUM_DICT = {
     'jan': 1,
     'feb': 2,
@@ -0,0 +1,104 @@
+import logging
+import os
+import threading
+import datetime as dt
+from collections import Counter, defaultdict
+from config import DETAIL_CACHE_FILE, DETAIL_CACHE_TTL_DAYS
+from fingerprints import FragmentStore
+from utils import current_venue, write_file_atomic
+import codec
+
+def _encode(value):
+    """Make extracted fields JSON safe, tagging dates so they come back as dates."""
+    if isinstance(value, dict):
+        return {k: _encode(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    if isinstance(value, dt.date):
+        return {'__date__': value.isoformat()}
+    return value
+
+def _decode(value):
+    if isinstance(value, dict):
+        if set(value) == {'__date__'}:
+            return dt.date.fromisoformat(value['__date__'])
+        return {k: _decode(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    return value
+
+class DetailCache:
+    """Fields extracted from event detail pages, keyed by event URL, so unchanged pages aren't fetched again.
+
+    An entry is used while the listing card that links to the page hashes the same as when the entry
+    was stored and it is younger than the TTL for the event's phase (DETAIL_CACHE_TTL_DAYS).
+    """
+
+    def __init__(self, path, ttl_days=DETAIL_CACHE_TTL_DAYS, force=False):
+        self.path = path
+        self.ttl_days = ttl_days
+        self.force = force
+        self.lock = threading.Lock()
+        # url -> {'card': hash of the listing card, 'phase', 'fields', 'verified': when the page was last fetched}
+        self.index = {}
+        self.dirty = False
+        if path and os.path.exists(path):
+            try:
+                self.index = codec.load(path)
+            except ValueError as e:
+                logging.warning(f"Ignoring unreadable detail cache {path}: {e}")
+
+    def get(self, url, card):
+        """Return the cached fields for url, or None if the page has to be fetched."""
+        entry = self.index.get(url)
+        venue = current_venue.get()
+        fresh = (not self.force and entry is not None and entry['card'] == FragmentStore.fingerprint(card)
+                 and dt.datetime.now() - dt.datetime.fromisoformat(entry['verified'])
+                 < dt.timedelta(days=self.ttl_days.get(entry['phase'], self.ttl_days[None])))
+        with self.lock:
+            _detail_stats[venue]['hit' if fresh else 'miss'] += 1
+        return _decode(entry['fields']) if fresh else None
+
+    def put(self, url, card, phase, fields):
+        with self.lock:
+            self.index[url] = {
+                'card': FragmentStore.fingerprint(card),
+                'phase': phase,
+                'fields': _encode(fields),
+                'verified': dt.datetime.now().isoformat(timespec='seconds'),
+            }
+            self.dirty = True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            write_file_atomic(self.path, codec.dumps(self.index, pretty=False))
+            self.dirty = False
+
+_detail_cache = None
+# Per venue: detail pages served from the cache ('hit') and fetched ('miss')
+_detail_stats = defaultdict(Counter)
+
+def configure_detail_cache(enabled=True, force=False):
+    """Turn the detail cache on or off for this run; force=True fetches every page but still caches the fields."""
+    global _detail_cache
+    _detail_cache = DetailCache(DETAIL_CACHE_FILE, force=force) if enabled and DETAIL_CACHE_FILE else None
+
+def cached_details(url, card):
+    """Return the cached fields for an event page, or None if it needs fetching. Always None when the cache is off."""
+    if _detail_cache is None or not url or card is None:
+        return None
+    return _detail_cache.get(url, card)
+
+def store_details(url, card, phase, fields):
+    if _detail_cache is not None and url and card is not None:
+        _detail_cache.put(url, card, phase, fields)
+
+def save_detail_cache():
+    if _detail_cache is not None:
+        _detail_cache.save()
+
+def log_detail_cache_stats():
+    for venue, stats in _detail_stats.items():
+        logging.info(f"Detail cache for {venue}: {stats['hit']} pages reused, {stats['miss']} fetched")
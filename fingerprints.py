@@ -0,0 +1,147 @@
+import hashlib
+import logging
+import os
+import threading
+import datetime as dt
+from collections import Counter, defaultdict
+from config import FRAGMENT_STORE_FILE, FRAGMENT_REFRESH_DAYS, SCHEDULE_ADAPTIVE_PHASES, SCHEDULE_TIERS_DAYS
+from utils import current_venue, write_file_atomic
+import codec
+
+class FragmentStore:
+    """Hashes of the page fragments scrapers read, keyed by (url, selector), to skip unchanged ones.
+
+    A scraper calls unchanged() with the fragment it is about to extract events from and skips it
+    if the normalized hash matches the one recorded last run. The new hash only becomes the recorded
+    one once the scraper calls record() after processing the fragment, so a fragment whose events
+    failed to process is extracted again next run. A fragment is treated as changed if it was last
+    fully processed more than refresh_days ago.
+
+    Each entry also counts how often the fragment was checked and how often it had changed, which
+    due() turns into an adaptive schedule: pages of phases in SCHEDULE_ADAPTIVE_PHASES (archives)
+    are only fetched again after the SCHEDULE_TIERS_DAYS interval their change rate calls for.
+    """
+
+    def __init__(self, path, refresh_days=FRAGMENT_REFRESH_DAYS, force=False):
+        self.path = path
+        self.refresh_days = refresh_days
+        self.force = force
+        self.lock = threading.Lock()
+        # 'url selector' -> {'hash': sha256 of the normalized fragment, 'refreshed': date last processed,
+        # 'checked': date last fetched, 'first_checked', 'checks': times fetched, 'changes': times it had changed}
+        self.index = {}
+        self.pending = {}
+        self.dirty = False
+        if path and os.path.exists(path):
+            try:
+                self.index = codec.load(path)
+            except ValueError as e:
+                logging.warning(f"Ignoring unreadable fragment store {path}: {e}")
+
+    @staticmethod
+    def key(url, selector):
+        return f"{url} {selector}"
+
+    @staticmethod
+    def fingerprint(fragment):
+        """Hash a Tag or list of Tags, ignoring differences in whitespace."""
+        tags = fragment if isinstance(fragment, list) else [fragment]
+        text = ' '.join(' '.join(str(tag).split()) for tag in tags)
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def unchanged(self, url, selector, fragment):
+        """Return True if the fragment is identical to the one processed last run and not due a refresh."""
+        key = self.key(url, selector)
+        digest = self.fingerprint(fragment)
+        venue = current_venue.get()
+        with self.lock:
+            self.pending[key] = digest
+            entry = self.index.get(key)
+            if entry is not None:
+                entry['checks'] = entry.get('checks', 0) + 1
+                entry['checked'] = dt.date.today().isoformat()
+                self.dirty = True
+            skip = (not self.force and entry is not None and entry['hash'] == digest
+                    and dt.date.today() - dt.date.fromisoformat(entry['refreshed']) < dt.timedelta(days=self.refresh_days))
+            _fragment_stats[venue]['checked'] += 1
+            if skip:
+                _fragment_stats[venue]['skipped'] += 1
+            return skip
+
+    def record(self, url, selector):
+        """Record the hash passed to unchanged() as processed."""
+        key = self.key(url, selector)
+        with self.lock:
+            digest = self.pending.pop(key, None)
+            if digest is None:
+                return
+            today = dt.date.today().isoformat()
+            entry = self.index.setdefault(key, {'checks': 1, 'changes': 0, 'first_checked': today, 'checked': today})
+            if entry.get('hash', digest) != digest:
+                entry['changes'] = entry.get('changes', 0) + 1
+            entry['hash'] = digest
+            entry['refreshed'] = today
+            self.dirty = True
+
+    @staticmethod
+    def check_interval(entry):
+        """Return the days to wait between checks of a fragment, from its smoothed change rate per day."""
+        first_checked = dt.date.fromisoformat(entry.get('first_checked', entry['refreshed']))
+        days = max((dt.date.today() - first_checked).days, 1)
+        days_per_change = (days + 1) / (entry.get('changes', 0) + 1)
+        return max([tier for tier in SCHEDULE_TIERS_DAYS if tier <= days_per_change], default=SCHEDULE_TIERS_DAYS[0])
+
+    def due(self, url, selector, phase):
+        """Return True if the page holding the fragment should be fetched this run."""
+        entry = self.index.get(self.key(url, selector))
+        if self.force or phase not in SCHEDULE_ADAPTIVE_PHASES or entry is None:
+            return True
+        checked = dt.date.fromisoformat(entry.get('checked', entry['refreshed']))
+        if (dt.date.today() - checked).days >= self.check_interval(entry):
+            return True
+        with self.lock:
+            _fragment_stats[current_venue.get()]['not_due'] += 1
+        return False
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            write_file_atomic(self.path, codec.dumps(self.index, pretty=False))
+            self.dirty = False
+
+_fragment_store = None
+# Per venue: 'checked' fragments, how many of them were 'skipped' as unchanged, and pages 'not_due' for a check
+_fragment_stats = defaultdict(Counter)
+
+def configure_fragment_store(enabled=True, force=False):
+    """Turn fragment skipping on or off for this run; force=True fetches and processes every fragment but still records them."""
+    global _fragment_store
+    _fragment_store = FragmentStore(FRAGMENT_STORE_FILE, force=force) if enabled and FRAGMENT_STORE_FILE else None
+
+def fragment_due(url, selector, phase):
+    """Return True if the scraper should fetch the page holding this fragment. Always True when the store is off."""
+    if _fragment_store is None:
+        return True
+    return _fragment_store.due(url, selector, phase)
+
+def fragment_unchanged(url, selector, fragment):
+    """Return True if the scraper can skip this fragment. Always False when the store is off."""
+    if _fragment_store is None or fragment is None:
+        return False
+    return _fragment_store.unchanged(url, selector, fragment)
+
+def record_fragment(url, selector):
+    if _fragment_store is not None:
+        _fragment_store.record(url, selector)
+
+def save_fragment_store():
+    if _fragment_store is not None:
+        _fragment_store.save()
+
+def log_fragment_stats():
+    for venue, stats in _fragment_stats.items():
+        checked, skipped = stats['checked'], stats['skipped']
+        rate = f" ({skipped / checked:.0%})" if checked else ''
+        logging.info(f"Unchanged fragments for {venue}: skipped {skipped} of {checked}{rate}, "
+                     f"{stats['not_due']} pages not due for a check")
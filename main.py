@@ -1,66 +1,265 @@
+import argparse
+import cProfile
+import pstats
+import sys
 import time
 import logging
-import pandas as pd
-import numpy as np
+import importlib
 import os
-from config import configure_logging, DB_FILES
-from processing import update_event_phases
-from utils import load_db
-from scrapers.sf import de_young, sfmoma, cjm, bampfa, sf_women_artists, asian_art_museum, omca, \
-    kala, cantor, museum_of_craft_and_design, sj_museum_of_art
-from scrapers.la import lacma, the_broad
+import datetime as dt
+from contextlib import ExitStack, contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from config import configure_logging, DB_FILES, STORE_CHECKPOINT_EVERY, HTTP_CACHE_TTL, HTTP_TIMEOUT, \
+    VENUE_TIMINGS_FILE, VENUE_TIMINGS_HISTORY
+from processing import apply_phase_update, EventPipeline
+from store import open_store
+from fingerprints import configure_fragment_store, save_fragment_store, log_fragment_stats
+from detail_cache import configure_detail_cache, save_detail_cache, log_detail_cache_stats
+from utils import venue_context, VenueLogBuffer, configure_response_cache, save_response_cache, open_archive, close_archive, \
+    ReplayMissError, log_connection_stats, log_cache_stats, log_fetch_health, fetch_health, set_http_timeout, \
+    write_file_atomic
+import codec
+
+# Venue name -> region, scraper function(s) as 'module:function' strings (imported only when the venue
+# is selected) and the venue's site
+VENUES = {
+    "de Young Museum": {
+        'region': 'sf',
+        'scraper': 'scrapers.sf.de_young:scrape_de_young_and_legion_of_honor',
+        'site': 'https://www.famsf.org',
+    },
+    "SFMOMA": {
+        'region': 'sf',
+        'scraper': 'scrapers.sf.sfmoma:scrape_sfmoma',
+        'site': 'https://www.sfmoma.org',
+    },
+    "Contemporary Jewish Museum": {
+        'region': 'sf',
+        'scraper': 'scrapers.sf.cjm:scrape_contemporary_jewish_museum',
+        'site': 'https://www.thecjm.org',
+    },
+    "BAMPFA": {
+        'region': 'sf',
+        'scraper': 'scrapers.sf.bampfa:scrape_bampfa_exhibitions',
+        'site': 'https://bampfa.org',
+    },
+    "SF Women Artists": {
+        'region': 'sf',
+        'scraper': 'scrapers.sf.sf_women_artists:scrape_sfwomenartists',
+        'site': 'https://www.sfwomenartists.org',
+    },
+    "Asian Art Museum": {
+        'region': 'sf',
+        'scraper': [
+            'scrapers.sf.asian_art_museum:scrape_asian_art_museum_current_events',
+            'scrapers.sf.asian_art_museum:scrape_asian_art_museum_past_events',
+        ],
+        'site': 'https://exhibitions.asianart.org',
+    },
+    "Oakland Museum of California": {
+        'region': 'sf',
+        'scraper': 'scrapers.sf.omca:scrape_oak_museum_of_ca_exhibitions',
+        'site': 'https://museumca.org',
+    },
+    "Kala Art Institute": {
+        'region': 'sf',
+        'scraper': 'scrapers.sf.kala:scrape_kala_exhibitions',
+        'site': 'https://www.kala.org',
+    },
+    "Cantor Arts Center": {
+        'region': 'sf',
+        'scraper': 'scrapers.sf.cantor:scrape_cantor_exhibitions',
+        'site': 'https://museum.stanford.edu',
+    },
+    "Museum of Craft and Design": {
+        'region': 'sf',
+        'scraper': 'scrapers.sf.museum_of_craft_and_design:scrape_museum_of_craft_and_design_exhibitions',
+        'site': 'https://sfmcd.org',
+    },
+    "San Jose Museum of Art": {
+        'region': 'sf',
+        'scraper': 'scrapers.sf.sj_museum_of_art:scrape_sj_museum_of_art_exhibitions',
+        'site': 'https://sjmusart.org',
+    },
+    "LACMA": {
+        'region': 'la',
+        'scraper': 'scrapers.la.lacma:scrape_lacma_exhibitions',
+        'site': 'https://www.lacma.org',
+    },
+    "The Broad": {
+        'region': 'la',
+        'scraper': 'scrapers.la.the_broad:scrape_the_broad_exhibitions',
+        'site': 'https://www.thebroad.org',
+    },
+}
+
+def load_scraper(target):
+    """Import and return the scraper function named by a 'module:function' string."""
+    module_name, function_name = target.split(':')
+    return getattr(importlib.import_module(module_name), function_name)
 
 def get_venue_scrapers(selected_regions=None, selected_venues=None, skip_venues=None):
-    """Return dictionary of venue:scraper pairs and venue-to-region mapping"""
-    all_scrapers = {
-        'sf': {
-            "de Young Museum": de_young.scrape_de_young_and_legion_of_honor,
-            "SFMOMA": sfmoma.scrape_sfmoma,
-            "Contemporary Jewish Museum": cjm.scrape_contemporary_jewish_museum,
-            "BAMPFA": bampfa.scrape_bampfa_exhibitions,
-            "SF Women Artists": sf_women_artists.scrape_sfwomenartists,
-            "Asian Art Museum": [
-                asian_art_museum.scrape_asian_art_museum_current_events,
-                asian_art_museum.scrape_asian_art_museum_past_events,
-            ],
-            "Oakland Museum of California": omca.scrape_oak_museum_of_ca_exhibitions,
-            "Kala Art Institute": kala.scrape_kala_exhibitions,
-            "Cantor Arts Center": cantor.scrape_cantor_exhibitions,
-            "Museum of Craft and Design": museum_of_craft_and_design.scrape_museum_of_craft_and_design_exhibitions,
-            "San Jose Museum of Art": sj_museum_of_art.scrape_sj_museum_of_art_exhibitions,
-        },
-        'la': {
-            "LACMA": lacma.scrape_lacma_exhibitions,
-            "The Broad": the_broad.scrape_the_broad_exhibitions,
-        }
-    }
-    
-    # Create venue to region mapping
-    venue_to_region = {}
-    for region, scrapers in all_scrapers.items():
-        for venue in scrapers:
-            venue_to_region[venue] = region
-    
-    # Filter and flatten scrapers as before
-    if selected_regions:
-        all_scrapers = {k: v for k, v in all_scrapers.items() if k in selected_regions}
-    
+    """Return dictionary of venue:scraper pairs and venue-to-region mapping
+
+    Only the scraper modules of the venues that are returned get imported.
+    """
+    venue_to_region = {venue: info['region'] for venue, info in VENUES.items()}
+
+    selected = [
+        venue for venue, region in venue_to_region.items()
+        if (not selected_regions or region in selected_regions)
+        and (not selected_venues or venue in selected_venues)
+        and (not skip_venues or venue not in skip_venues)
+    ]
+
     venues = {}
-    for region_scrapers in all_scrapers.values():
-        venues.update(region_scrapers)
-    
-    if selected_venues:
-        venues = {k: v for k, v in venues.items() if k in selected_venues}
-    
-    if skip_venues:
-        venues = {k: v for k, v in venues.items() if k not in skip_venues}
-    
+    for venue in selected:
+        scraper = VENUES[venue]['scraper']
+        venues[venue] = [load_scraper(s) for s in scraper] if isinstance(scraper, list) else load_scraper(scraper)
+
     return venues, venue_to_region
 
-def main(env='prod', selected_regions=None, selected_venues=None, skip_venues=None, write_summary=True):
+def load_venue_timings(path=VENUE_TIMINGS_FILE):
+    """Return {venue: [wall times in seconds of its most recent runs]}."""
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        return codec.load(path)
+    except ValueError as e:
+        logging.warning(f"Ignoring unreadable venue timings {path}: {e}")
+        return {}
+
+def save_venue_timings(timings, durations, path=VENUE_TIMINGS_FILE):
+    """Add this run's wall time per venue to the history, keeping the last VENUE_TIMINGS_HISTORY runs."""
+    if not path or not durations:
+        return
+    timings = dict(timings)
+    for venue, duration in durations.items():
+        timings[venue] = (timings.get(venue, []) + [round(duration, 2)])[-VENUE_TIMINGS_HISTORY:]
+    write_file_atomic(path, codec.dumps(timings, pretty=False))
+
+def schedule_venues(venues, timings):
+    """Order venues longest expected wall time first (LPT) so no long venue is left running alone at the end.
+
+    The expected time is the mean of the venue's recent runs. Venues without history go first, as
+    they could be the longest; sorting is stable, so without any history this is registry order.
+    """
+    def expected(venue):
+        history = timings.get(venue)
+        return sum(history) / len(history) if history else float('inf')
+    return sorted(venues, key=expected, reverse=True)
+
+@contextmanager
+def thread_profile(profiles):
+    """Profile the calling thread with a new cProfile profiler appended to profiles (a no-op if profiles is None).
+
+    Before Python 3.12 a profiler only sees the thread that enabled it, so each worker needs its
+    own. From 3.12 the main thread's profiler already sees every thread and enabling a second one
+    raises ValueError, in which case this does nothing.
+    """
+    if profiles is None:
+        yield
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        yield
+        return
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiles.append(profiler)
+
+def scrape_venue(venue, scraper, region, profiles=None):
+    """Run a venue's scraper (or list of scrapers) and return the events they yield, the wall time taken
+    and the error that stopped them (None if they finished).
+
+    A scraper that raises doesn't stop the run; the events it yielded before the error are kept.
+    """
+    start = time.monotonic()
+    events = []
+    error = None
+    with venue_context(venue), thread_profile(profiles):
+        logging.info(f"[{region}] Starting scrape for {venue}")
+        try:
+            for s in scraper if isinstance(scraper, list) else [scraper]:
+                events.extend(s())
+        except Exception as e:
+            logging.error(f"[{region}] Scrape failed for {venue}: {e}", exc_info=True)
+            error = f"{type(e).__name__}: {e}"
+        logging.info(f"[{region}] Finished scrape for {venue}")
+    return events, time.monotonic() - start, error
+
+def run_venues(venues, venue_to_region, pipeline, jobs=1, order=None, profiles=None):
+    """Scrape up to jobs venues at a time, handing their events to the pipeline in registry order.
+
+    Venues are started in the given order (defaults to registry order, which is the only order
+    that makes sense with jobs=1). The pipeline writes a
+    venue's events while the next venues are still being fetched, and is the only writer, so the
+    dbs come out the same whichever venue finishes first. Logs made for a venue are held back and
+    released by the writer right after that venue's events, so the log reads the same as a run
+    with jobs=1. Returns ({venue: wall time in seconds}, {venue: error} for the venues that failed).
+    """
+    durations = {}
+    errors = {}
+    with VenueLogBuffer(venues) as log_buffer:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = {venue: executor.submit(scrape_venue, venue, venues[venue], venue_to_region[venue], profiles)
+                       for venue in order or venues}
+            for venue in venues:
+                events, durations[venue], error = futures[venue].result()
+                if error is not None:
+                    errors[venue] = error
+                pipeline.put(venue, venue_to_region[venue], events)
+                pipeline.call(log_buffer.release_venue, venue)
+        pipeline.join()
+    return durations, errors
+
+def main(env='prod', selected_regions=None, selected_venues=None, skip_venues=None, write_summary=True,
+         http_cache='use', record=None, replay=None, jobs=1, force_refresh=False, dry_run=False, profile=None):
+    """Run the scrapers and update the event dbs. Returns a JSON-safe summary of the run.
+
+    http_cache controls the on-disk response cache: 'use' (default), 'refresh' (re-download
+    everything but keep the cache up to date), 'off', or 'clear' (delete it first).
+    record is a path to save every fetched page to as a zip archive; replay is a path to such
+    an archive to serve every page from instead of the network, failing on pages it lacks.
+    jobs is the number of venues scraped at the same time. force_refresh fetches and re-extracts
+    every page, ignoring the adaptive check schedule and unchanged fragments.
+    dry_run scrapes and validates every event but writes nothing: no dbs, no db_size.csv and no
+    caches, so the next run behaves as if this one hadn't happened. profile is a path to save
+    cProfile stats of the run to, for python -m pstats.
+
+    The summary has, per venue, the events written and dropped as invalid, the pages that
+    failed to fetch, the wall time and the error that stopped its scraper; the db changes per
+    region; and 'failed', the venues whose scraper raised or that yielded no events because
+    their pages couldn't be fetched.
+    """
+    profiler = profiles = None
+    if profile:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        profiles = []
     configure_logging(env)
     logging.info("----------NEW LOG----------")
     logging.info(f"Environment: {env}")
+    # Only prod runs write the dbs, and a dry run writes nothing at all
+    write = env == 'prod' and not dry_run
+    if dry_run:
+        logging.info("Dry run, nothing will be written")
+    configure_response_cache(http_cache, ttl=HTTP_CACHE_TTL.get(env, 0), env=env)
+    # Replays always re-extract every fragment, and refreshing the cache processes every fragment again too.
+    # Recording fetches every page too (no schedule, no cached details) so the archive has all a replay asks for
+    force_refresh = force_refresh or http_cache in ('refresh', 'clear', 'off') or bool(record)
+    configure_fragment_store(enabled=(write and not replay), force=force_refresh)
+    configure_detail_cache(enabled=not (replay or record), force=force_refresh)
+    if replay:
+        open_archive(replay, 'replay')
+        logging.info(f"Starting replay from {replay}")
+    elif record:
+        open_archive(record, 'record')
+        logging.info(f"Starting to record pages to {record}")
 
     start_time = time.time()
     logging.info('Starting the scraping process')
@@ -76,43 +275,84 @@ def main(env='prod', selected_regions=None, selected_venues=None, skip_venues=No
     # Get both the scrapers and the mapping
     venues, venue_to_region = get_venue_scrapers(selected_regions, selected_venues, skip_venues)
 
-    for venue, scraper in venues.items():
-        region = venue_to_region[venue]
-        logging.info(f"[{region}] Starting scrape for {venue}")
-        if isinstance(scraper, list):
-            for s in scraper:
-                s(env=env, region=region)
+    venue_count = event_count = None
+    with ExitStack() as stack:
+        # Open one store per region so events are written to disk once at the end of the run
+        stores = {}
+        if write:
+            stores = {region: stack.enter_context(open_store(region, checkpoint_every=STORE_CHECKPOINT_EVERY))
+                      for region in DB_FILES}
+
+        # Scraped events are validated and written (or, in dev and dry runs, logged) by the pipeline's writer thread
+        pipeline = EventPipeline(write=write)
+        stack.callback(pipeline.close)
+        timings = load_venue_timings()
+        # Results are handed to the writer in registry order, so with one job reordering would only
+        # hold every venue's events (and logs) back until the last venue finished
+        order = schedule_venues(venues, timings) if jobs > 1 else None
+        durations, errors = run_venues(venues, venue_to_region, pipeline, jobs=jobs, order=order, profiles=profiles)
+
+        if write and write_summary:
+            # Update the event phases for each db
+            today = dt.datetime.now().date()
+            for region, store in stores.items():
+                for venue, event_key, event in list(store.iter_events(ended_before=today.isoformat(), skip_past=True)):
+                    try:
+                        if apply_phase_update(event, today):
+                            store.put(venue, event_key, event)
+                    except Exception as e:
+                        logging.error(f"[Error processing event '{event_key}': {e}")
+
+            # Count the venues and events
+            event_count = sum(store.count_events() for store in stores.values())
+            venue_count = sum(store.count_venues() for store in stores.values())
+            logging.info("Database contains {:,} venues and {:,} events".format(venue_count, event_count))
+
+            # Report how many scraped events were new, changed or identical to what was stored
+            for region, store in stores.items():
+                logging.info("[{}] Database changes: {:,} added, {:,} changed, {:,} unchanged".format(
+                    region, store.stats['added'], store.stats['changed'], store.stats['unchanged']))
+        db_changes = {region: {result: store.stats[result] for result in ('added', 'changed', 'unchanged')}
+                      for region, store in stores.items()}
+
+    health = fetch_health()
+    if not dry_run:
+        # In prod only keep the new HTTP validators of venues whose events are safely on disk, so a
+        # page answering 304 next run never hides events that weren't written. Dev has its own cache
+        # and keeps everything, for its TTL
+        if env == 'prod':
+            save_response_cache(venues=[venue for venue in venues if write and venue not in errors
+                                        and not health.get(venue, {}).get('errors')])
         else:
-            scraper(env=env, region=region)
-        logging.info(f"[{region}] Finished scrape for {venue}")
+            save_response_cache()
+        # Replayed and dev runs don't take as long as a real run against the sites, nor do failed venues
+        if write and not replay:
+            save_venue_timings(timings, {venue: d for venue, d in durations.items() if venue not in errors})
+        save_fragment_store()
+        save_detail_cache()
+    run_errors = []
+    try:
+        close_archive()
+    except ReplayMissError as e:
+        logging.error(str(e))
+        run_errors.append(str(e))
 
-    if env == 'prod' and write_summary:
-        # Load dbs and regions
-        dbs = {region: load_db(db_file) for region, db_file in DB_FILES.items()}
-        
-        # Update the event phases for each db
-        for region, db in dbs.items():
-            update_event_phases(db, region)
-        
-        # Count the venues and events
-        event_count = sum(len(events) for db in dbs.values() for events in db.values())
-        venue_count = sum(len(db) for db in dbs.values())
-        logging.info("Database contains {:,} venues and {:,} events".format(venue_count, event_count))
-        
-        # Capture the execution time and convert to minutes and seconds
-        execution_time_s = round(time.time() - start_time, 1)
+    # Capture the execution time and convert to minutes and seconds
+    execution_time_s = round(time.time() - start_time, 1)
+    if write and write_summary:
         minutes = int(execution_time_s // 60)
         seconds = int(execution_time_s % 60)
         logging.info(f"Scraping took {minutes} min, {seconds} sec")
         
-        # Record the number of venues and events in the db
+        # Record the number of venues and events in the db (pandas is slow to import, only load it here)
+        import pandas as pd
         file_path = 'docs/data/db_size.csv'
         df = pd.DataFrame([{
             "timestamp": pd.Timestamp.now(),
             "num_venues": venue_count,
             "num_events": event_count,
             "scrape_time_s": execution_time_s,
-            "regions": ','.join(selected_regions) if selected_regions else ','.join(dbs.keys())
+            "regions": ','.join(selected_regions) if selected_regions else ','.join(stores.keys())
         }])
         # Check if the file exists
         if os.path.exists(file_path):
@@ -123,7 +363,101 @@ def main(env='prod', selected_regions=None, selected_venues=None, skip_venues=No
             df.to_csv(file_path, mode='w', header=True, index=False)
         logging.info("Database size recorded")
 
+    venue_summary = {}
+    for venue in venues:
+        counts = pipeline.stats.get(venue, {})
+        venue_summary[venue] = {
+            'region': venue_to_region[venue],
+            'events': counts.get('written', 0),
+            'invalid': counts.get('invalid', 0),
+            'fetch_errors': health.get(venue, {}).get('errors', 0),
+            'retries': health.get(venue, {}).get('retries', 0),
+            'breaker': health.get(venue, {}).get('breaker', 'closed'),
+            'times_opened': health.get(venue, {}).get('times_opened', 0),
+            'duration_s': round(durations[venue], 2),
+            'error': errors.get(venue),
+        }
+    failed = [venue for venue, result in venue_summary.items()
+              if result['error'] or (not result['events'] and result['fetch_errors'])]
+    if failed:
+        logging.error(f"Failed venues: {', '.join(failed)}")
+
+    log_connection_stats()
+    log_cache_stats()
+    log_fetch_health()
+    log_fragment_stats()
+    log_detail_cache_stats()
+    if profiler is not None:
+        profiler.disable()
+        stats = pstats.Stats(profiler)
+        for venue_profiler in profiles:
+            stats.add(venue_profiler)
+        stats.dump_stats(profile)
+        logging.info(f"Profile saved to {profile}")
     logging.info("Finished")
 
+    return {
+        'env': env,
+        'dry_run': dry_run,
+        'started': dt.datetime.fromtimestamp(start_time).isoformat(timespec='seconds'),
+        'duration_s': execution_time_s,
+        'jobs': jobs,
+        'venues': venue_summary,
+        'db_changes': db_changes,
+        'db_size': {'venues': venue_count, 'events': event_count} if event_count is not None else None,
+        'failed': failed,
+        'errors': run_errors,
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Scrape the venues' exhibitions into the event dbs.",
+        epilog="Exits with status 1 if any venue failed (see 'failed' in the --summary JSON).")
+    parser.add_argument('--env', choices=['prod', 'dev'], default='prod',
+                        help="dev logs the scraped events instead of writing them to the dbs")
+    parser.add_argument('--regions', nargs='+', metavar='REGION', choices=sorted(DB_FILES),
+                        help=f"only scrape venues in these regions ({', '.join(sorted(DB_FILES))})")
+    parser.add_argument('--venues', nargs='+', metavar='VENUE', help="only scrape these venues")
+    parser.add_argument('--skip', nargs='+', metavar='VENUE', help="don't scrape these venues")
+    parser.add_argument('-j', '--jobs', type=int, default=1, help="number of venues scraped at the same time")
+    parser.add_argument('--connect-timeout', type=float, metavar='SECONDS',
+                        help=f"HTTP connect timeout (default {HTTP_TIMEOUT[0]})")
+    parser.add_argument('--read-timeout', type=float, metavar='SECONDS',
+                        help=f"HTTP read timeout (default {HTTP_TIMEOUT[1]})")
+    parser.add_argument('--http-cache', choices=['use', 'refresh', 'off', 'clear'], default='use',
+                        help="on-disk response cache mode")
+    parser.add_argument('--force-refresh', action='store_true',
+                        help="fetch and re-extract every page, ignoring the check schedule and unchanged fragments")
+    archive = parser.add_mutually_exclusive_group()
+    archive.add_argument('--record', metavar='ZIP', help="save every fetched page to a zip archive")
+    archive.add_argument('--replay', metavar='ZIP', help="serve every page from a recorded archive")
+    parser.add_argument('--dry-run', action='store_true', help="scrape and validate, but write no dbs or caches")
+    parser.add_argument('--profile', metavar='PATH', help="save cProfile stats of the run and print the top functions")
+    parser.add_argument('--summary', metavar='PATH', help="write a JSON summary of the run to PATH ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    unknown = (set(args.venues or []) | set(args.skip or [])) - set(VENUES)
+    if unknown:
+        parser.error(f"unknown venues: {', '.join(sorted(unknown))} (known: {', '.join(VENUES)})")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    return args
+
+def cli(argv=None):
+    """Run main() with command line arguments. Returns the exit status: 1 if any venue failed, else 0."""
+    args = parse_args(argv)
+    set_http_timeout(args.connect_timeout, args.read_timeout)
+    summary = main(env=args.env, selected_regions=args.regions, selected_venues=args.venues, skip_venues=args.skip,
+                   http_cache=args.http_cache, record=args.record, replay=args.replay, jobs=args.jobs,
+                   force_refresh=args.force_refresh, dry_run=args.dry_run, profile=args.profile)
+    if args.summary == '-':
+        print(codec.dumps(summary).decode('utf-8'))
+    elif args.summary:
+        write_file_atomic(args.summary, codec.dumps(summary))
+    if args.profile:
+        # stderr, so the summary can go to stdout
+        pstats.Stats(args.profile, stream=sys.stderr).sort_stats('cumulative').print_stats(25)
+    return 1 if summary['failed'] or summary['errors'] else 0
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(cli())
@@ -1,28 +1,162 @@
 import json
+import queue
+import threading
 from hashlib import md5
 import datetime as dt
 import logging
-from config import DB_FILES
-from utils import load_db, save_db
+from collections import Counter
+from config import FINGERPRINT_FIELDS, VOLATILE_FIELDS
+from utils import save_db, venue_context
+from store import create_store, get_open_store
 
 def generate_event_hash(event_details):
-    event_string = json.dumps(event_details, sort_keys=True, default=str)
+    """Hash the semantic fields of an event so re-scraping unchanged content gives the same hash."""
+    fingerprint = {
+        field: event_details[field]
+        for field in FINGERPRINT_FIELDS
+        if field in event_details and field not in VOLATILE_FIELDS
+    }
+    # Tag order carries no meaning (update_event_phases appends 'past' at the end)
+    if fingerprint.get('tags') is not None:
+        fingerprint['tags'] = sorted(tag for tag in fingerprint['tags'] if tag is not None)
+    # Dates are date objects when scraped and ISO strings when loaded, default=str makes both the same
+    event_string = json.dumps(fingerprint, sort_keys=True, separators=(',', ':'), default=str)
     return md5(event_string.encode('utf-8')).hexdigest()
 
 def generate_unique_identifier(event_details):
     return f"{event_details['name']}-{event_details['venue']}"
 
-def process_event(event_details, region):
-    db = load_db(DB_FILES[region])
-    site_events = db.get(event_details['venue'], {})
+def upsert_event(store, event_details):
+    """Write an event into the store if it is new or its content changed.
+
+    Returns 'added', 'changed' or 'unchanged' and counts the outcome in store.stats.
+    """
     event_id = generate_unique_identifier(event_details)
     event_hash = generate_event_hash(event_details)
+    stored = store.get(event_details['venue'], event_id)
 
-    if event_id not in site_events or site_events[event_id]['hash'] != event_hash:
+    if stored is None:
+        logging.info(f"Adding event: {event_details['name']}")
+        result = 'added'
+    elif stored.get('hash') != event_hash:
         logging.info(f"Updating event: {event_details['name']}")
-        site_events[event_id] = {**event_details, 'hash': event_hash}
-        db[event_details['venue']] = site_events
-        save_db(db, region)
+        result = 'changed'
+    else:
+        result = 'unchanged'
+
+    if result != 'unchanged':
+        store.put(event_details['venue'], event_id, {**event_details, 'hash': event_hash})
+    store.stats[result] += 1
+    return result
+
+def process_event(event_details, region):
+    # Use the run-scoped store if main.main opened one, otherwise load and save the db for this event
+    store = get_open_store(region)
+    if store is not None:
+        return upsert_event(store, event_details)
+    store = create_store(region)
+    result = upsert_event(store, event_details)
+    store.flush()
+    store.close()
+    return result
+
+def validate_event(event_details):
+    """Check that a scraped event has the fields the db and the site rely on, logging why if not."""
+    if not isinstance(event_details, dict):
+        problem = f"not a dict: {event_details!r}"
+    elif not event_details.get('name') or not isinstance(event_details['name'], str):
+        problem = f"missing name (links: {event_details.get('links')})"
+    elif not event_details.get('venue') or not isinstance(event_details['venue'], str):
+        problem = "missing venue"
+    elif not isinstance(event_details.get('dates'), dict):
+        problem = "dates is not a dict"
+    elif not isinstance(event_details.get('tags'), list):
+        problem = "tags is not a list"
+    else:
+        return True
+    logging.warning(f"Dropping invalid event from {event_details.get('venue') if isinstance(event_details, dict) else None}: {problem}")
+    return False
+
+class EventPipeline:
+    """Single writer between the scrapers and the region stores.
+
+    Batches of scraped events are queued with put() and validated, hashed and upserted (with
+    write=False, only logged) by one background thread in the order they were queued, so writing one venue's
+    events overlaps with fetching the next venue's pages. call() queues any other function to run
+    on the writer thread in order with the batches. After an error the rest of the queue is dropped
+    and join() re-raises it.
+    """
+
+    def __init__(self, write=True):
+        self.write = write
+        self.queue = queue.Queue()
+        self.error = None
+        # Per venue: events 'written' (or only logged) and 'invalid' events dropped
+        self.stats = {}
+        self.thread = threading.Thread(target=self._run, name='event-writer', daemon=True)
+        self.thread.start()
+
+    def put(self, venue, region, events):
+        self.queue.put((self._write, (venue, region, events)))
+
+    def call(self, func, *args):
+        self.queue.put((func, args))
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                if self.error is None:
+                    func, args = item
+                    func(*args)
+            except Exception as e:
+                logging.error(f"Event writer failed: {e}", exc_info=True)
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+    def _write(self, venue, region, events):
+        stats = self.stats.setdefault(venue, Counter())
+        with venue_context(venue):
+            for event_details in events:
+                if not validate_event(event_details):
+                    stats['invalid'] += 1
+                    continue
+                if self.write:
+                    process_event(event_details, region)
+                else:
+                    logging.info(f"Event found: {event_details['name']} at {event_details['venue']}")
+                stats['written'] += 1
+
+    def join(self):
+        """Wait for everything queued so far, re-raising the error that stopped the writer if there was one."""
+        self.queue.join()
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+def apply_phase_update(event, today):
+    """Move an event to the 'past' phase if its end date has passed. Returns True if the event changed."""
+    # Get the end date of the event (a date object if it was scraped this run, a string if loaded from disk)
+    end_date = event['dates'].get('end')
+    if end_date and isinstance(end_date, str):
+        end_date = dt.datetime.strptime(end_date, '%Y-%m-%d').date()
+    # If the event has an end date and the end date is in the past, set the event phase to 'past'
+    if not end_date or end_date >= today:
+        return False
+    before = (event.get('phase'), event.get('ongoing'), list(event['tags']))
+    event['phase'] = 'past'
+    event['ongoing'] = False
+    event['tags'] = [tag for tag in event['tags'] if tag != 'current']
+    # If the event is not tagged as 'past', add the 'past' tag
+    if 'past' not in event['tags']:
+        event['tags'].append('past')
+    return before != (event['phase'], event['ongoing'], event['tags'])
 
 def update_event_phases(db, region):
     today = dt.datetime.now().date()
@@ -31,17 +165,7 @@ def update_event_phases(db, region):
         # Iterate over each event in the venue
         for event_key, event in events.items():
             try:
-                # Get the end date of the event
-                end_date_str = event['dates'].get('end')
-                end_date = dt.datetime.strptime(end_date_str, '%Y-%m-%d').date() if end_date_str else None
-                # If the event has an end date and the end date is in the past, set the event phase to 'past'
-                if end_date and end_date < today:
-                    event['phase'] = 'past'
-                    event['ongoing'] = False
-                    event['tags'] = [tag for tag in event['tags'] if tag != 'current']
-                    # If the event is not tagged as 'past', add the 'past' tag
-                    if 'past' not in event['tags']:
-                        event['tags'].append('past')
+                apply_phase_update(event, today)
             except Exception as e:
                 logging.error(f"[Error processing event '{event_key}': {e}")
     save_db(db, region)
\ No newline at end of file
@@ -1,10 +1,13 @@
+from bs4 import SoupStrainer
 from utils import fetch_and_parse
-from processing import process_event
 from config import MONTH_TO_NUM_DICT
 import datetime as dt
 from datetime import timezone
 import logging
 
+# Exhibition listings only read the exhibition list, not the site header, footer and menus
+EXHIBITION_LIST_REGION = SoupStrainer('div', class_='exhibition-list')
+
 def convert_date_to_dt(date_string):
     """Converts a date in string form to a dt.date object."""
     date_parts = date_string.lower().split()
@@ -16,12 +19,12 @@ def convert_date_to_dt(date_string):
     else:
         return None
 
-def scrape_lacma_exhibitions(env='prod', region='la'):
-    """Scrape and process exhibitions from LACMA."""
+def scrape_lacma_exhibitions():
+    """Scrape and yield exhibitions from LACMA."""
     
     def process_exhibitions(url, phase):
         """Process exhibitions from the given URL for the specified phase."""
-        soup = fetch_and_parse(url)
+        soup = fetch_and_parse(url, parse_only=EXHIBITION_LIST_REGION)
         if soup is None:
             logging.warning(f"Error scraping LACMA {phase} exhibitions --> no soup found")
             return
@@ -107,18 +110,13 @@ def scrape_lacma_exhibitions(env='prod', region='la'):
             if image_link:
                 event_details['links'].append({'link': image_link, 'description': 'Image'})
 
-            # Add logging for dev environment
-            logging.info(f"Event details in dev - Name: {event_details.get('name')}, Venue: {event_details.get('venue')}")
-
-            # Process event in prod environment
-            if env == 'prod':
-                process_event(event_details, region)
+            yield event_details
 
     # Scrape current exhibitions
-    process_exhibitions('https://www.lacma.org/currentexhibitions', 'current')
+    yield from process_exhibitions('https://www.lacma.org/currentexhibitions', 'current')
 
     # Scrape upcoming exhibitions
-    process_exhibitions('https://www.lacma.org/upcomingexhibitions', 'future')
+    yield from process_exhibitions('https://www.lacma.org/upcomingexhibitions', 'future')
 
     # Scrape past exhibitions
-    process_exhibitions('https://www.lacma.org/pastexhibitions', 'past')
+    yield from process_exhibitions('https://www.lacma.org/pastexhibitions', 'past')
@@ -1,10 +1,9 @@
-from utils import fetch_and_parse
-from processing import process_event
+from utils import fetch_and_parse, fetch_many, NOT_MODIFIED
+from detail_cache import cached_details, store_details
 from config import MONTH_TO_NUM_DICT
 import datetime as dt
 from datetime import timezone
 import logging
-import time
 
 def convert_date_to_dt(date_string):
     """Converts a date in string form to a dt.date object."""
@@ -17,9 +16,10 @@ def convert_date_to_dt(date_string):
     else:
         return None
 
-def scrape_exhibition_details(url):
-    """Scrape details from an individual exhibition page."""
-    soup = fetch_and_parse(url)
+def scrape_exhibition_details(url, soup=None):
+    """Scrape details from an individual exhibition page, using an already fetched soup if given."""
+    if soup is None:
+        soup = fetch_and_parse(url)
     if soup is None:
         logging.warning(f"Error scraping exhibition details from {url}")
         return None
@@ -143,8 +143,8 @@ def scrape_exhibition_details(url):
         'image_link': image_link
     }
 
-def scrape_the_broad_exhibitions(env='prod', region='la'):
-    """Scrape and process exhibitions from The Broad."""
+def scrape_the_broad_exhibitions():
+    """Scrape and yield exhibitions from The Broad."""
     
     def process_exhibitions(url, phase):
         """Process exhibitions from the given URL for the specified phase.
@@ -153,7 +153,11 @@ def scrape_the_broad_exhibitions(env='prod', region='la'):
             url: The URL to scrape
             phase: The phase of exhibitions ('current', 'future', or 'past')
         """
-        soup = fetch_and_parse(url)
+        # The past exhibitions page rarely changes, skip it (and its detail pages) when the server says it hasn't
+        soup = fetch_and_parse(url, if_modified=(phase == 'past'))
+        if soup is NOT_MODIFIED:
+            logging.info(f"Skipping The Broad {phase} exhibitions, page not modified")
+            return
         if soup is None:
             logging.warning(f"Error scraping The Broad {phase} exhibitions --> no soup found")
             return
@@ -180,15 +184,24 @@ def scrape_the_broad_exhibitions(env='prod', region='la'):
                 href = 'https://www.thebroad.org' + href
             exhibition_links.append(href)
         
+        # Reuse the details of exhibitions whose link card is unchanged and cache entry hasn't expired, fetch
+        # the other exhibition pages concurrently (fetch_many keeps the per-host rate polite)
+        cached = [cached_details(event_link, link) for event_link, link in zip(exhibition_links, links)]
+        links_to_fetch = [event_link for event_link, details in zip(exhibition_links, cached) if details is None]
+        detail_soups = dict(zip(links_to_fetch, fetch_many(links_to_fetch)))
+
         # Process each exhibition
-        for event_link in exhibition_links:
-            # Add a small delay between requests to be polite
-            time.sleep(1)
-            
+        for event_link, link, details in zip(exhibition_links, links, cached):
             # Get detailed information from the exhibition page
-            details = scrape_exhibition_details(event_link)
-            if not details:
-                continue
+            if details is None:
+                detail_soup = detail_soups[event_link]
+                if detail_soup is None:
+                    logging.warning(f"Error scraping exhibition details from {event_link}")
+                    continue
+                details = scrape_exhibition_details(event_link, detail_soup)
+                if not details:
+                    continue
+                store_details(event_link, link, phase, details)
 
             event_details = {
                 'name': details['name'],
@@ -205,18 +218,13 @@ def scrape_the_broad_exhibitions(env='prod', region='la'):
             if details['image_link']:
                 event_details['links'].append({'link': details['image_link'], 'description': 'Image'})
 
-            # Add logging for dev environment
-            logging.info(f"Event details in dev - Name: {event_details.get('name')}, Venue: {event_details.get('venue')}")
-
-            # Process event in prod environment
-            if env == 'prod':
-                process_event(event_details, region)
+            yield event_details
 
     # Scrape current exhibitions from the main page
-    process_exhibitions('https://www.thebroad.org/art', 'current')
+    yield from process_exhibitions('https://www.thebroad.org/art', 'current')
 
     # Scrape upcoming exhibitions from the main page
-    process_exhibitions('https://www.thebroad.org/art', 'future')
+    yield from process_exhibitions('https://www.thebroad.org/art', 'future')
 
     # Scrape past exhibitions from their dedicated page
-    process_exhibitions('https://www.thebroad.org/art/exhibitions/past', 'past') 
\ No newline at end of file
+    yield from process_exhibitions('https://www.thebroad.org/art/exhibitions/past', 'past') 
\ No newline at end of file
@@ -1,12 +1,15 @@
-from utils import fetch_and_parse
-from processing import process_event
+from bs4 import SoupStrainer
+from utils import fetch_and_parse, NOT_MODIFIED
 from config import MONTH_TO_NUM_DICT
 import datetime as dt
 from datetime import timezone
 import logging
 
-def scrape_asian_art_museum_current_events(env='prod', region='sf'):
-    """Scrape and process current events from Asian Art Museum."""
+# The past exhibitions page is only read inside the archive listing
+PAST_REGION = SoupStrainer(class_='exhibit-archive')
+
+def scrape_asian_art_museum_current_events():
+    """Scrape and yield current events from Asian Art Museum."""
 
     def convert_date_to_dt(date_string):
         """Takes a date in string form and converts it to a dt object"""
@@ -25,6 +28,9 @@ def scrape_asian_art_museum_current_events(env='prod', region='sf'):
     # Scrape info
     url = 'https://exhibitions.asianart.org/'
     soup = fetch_and_parse(url)
+    if soup is None:
+        logging.warning('Error scraping Asian Art Museum current events --> no soup found')
+        return
     
     # Get featured event (formatted differently than other events)
     featured_event = soup.find(class_='hero-card -wrap')
@@ -98,12 +104,7 @@ def scrape_asian_art_museum_current_events(env='prod', region='sf'):
                 'description': 'Image'
             })
 
-        # Add logging for dev environment
-        if env == 'dev':
-            logging.info(f"Event found: {event_details['name']} at {event_details['venue']}")
-
-        if env == 'prod':
-            process_event(event_details, region)
+        yield event_details
 
     # Find rest of events
     events_list = soup.find_all(class_='card split-grid__card split-grid__card--dark')
@@ -174,15 +175,10 @@ def scrape_asian_art_museum_current_events(env='prod', region='sf'):
                     'description': 'Image'
                 })
 
-            # Add logging for dev environment
-            if env == 'dev':
-                logging.info(f"Event found: {event_details['name']} at {event_details['venue']}")
-
-            if env == 'prod':
-                process_event(event_details, region)
+            yield event_details
 
-def scrape_asian_art_museum_past_events(env='prod', region='sf'):
-    """Scrape and process past events from Asian Art Museum."""
+def scrape_asian_art_museum_past_events():
+    """Scrape and yield past events from Asian Art Museum."""
     
     def convert_date_to_dt(date_string):
         """Takes a date in string form and converts it to a dt object"""
@@ -200,7 +196,13 @@ def scrape_asian_art_museum_past_events(env='prod', region='sf'):
 
     # Scrape info
     url = 'https://exhibitions.asianart.org/past/'
-    soup = fetch_and_parse(url)
+    soup = fetch_and_parse(url, if_modified=True, parse_only=PAST_REGION)
+    if soup is NOT_MODIFIED:
+        logging.info('Skipping Asian Art Museum past events, page not modified')
+        return
+    if soup is None:
+        logging.warning('Error scraping Asian Art Museum past events --> no soup found')
+        return
     
     # Find rest of events
     article_elements = soup.find(class_='exhibit-archive').find(class_='exhibit__content').find_all('article')
@@ -271,9 +273,4 @@ def scrape_asian_art_museum_past_events(env='prod', region='sf'):
                     'description': 'Image'
                 })
 
-            # Add logging for dev environment
-            if env == 'dev':
-                logging.info(f"Event found: {event_details['name']} at {event_details['venue']}")
-
-            if env == 'prod':
-                process_event(event_details, region)
\ No newline at end of file
+            yield event_details
\ No newline at end of file
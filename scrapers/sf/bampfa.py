@@ -1,5 +1,5 @@
 from utils import fetch_and_parse
-from processing import process_event
+from fingerprints import fragment_due, fragment_unchanged, record_fragment
 from config import MONTH_TO_NUM_DICT
 import datetime as dt
 from datetime import timezone
@@ -18,17 +18,27 @@ def convert_date_to_dt(date_string):
 
     return dt.date(year, month_num, day)
 
-def scrape_bampfa_exhibitions(env='prod', region='sf'):
-    """Scrape and process exhibitions from BAMPFA (Berkeley Art Museum and Pacific Film Archive)."""
+def scrape_bampfa_exhibitions():
+    """Scrape and yield exhibitions from BAMPFA (Berkeley Art Museum and Pacific Film Archive)."""
 
     def process_exhibitions(url, phase):
         """Process exhibitions for a given URL and phase (current, past)."""
+        # The past exhibitions archive rarely changes, only fetch it when its schedule says it is due
+        if not fragment_due(url, 'li.exhibition', phase):
+            logging.info(f"Skipping BAMPFA {phase} exhibitions, not due for a check")
+            return
+
         soup = fetch_and_parse(url)
         if soup is None:
             logging.warning(f"Error scraping BAMPFA {phase} exhibitions --> no soup found")
             return
 
         exhibition_list = soup.find_all('li', class_='exhibition')
+
+        # Skip the list if it is identical to the one processed last run
+        if exhibition_list and fragment_unchanged(url, 'li.exhibition', exhibition_list):
+            logging.info(f"BAMPFA {phase} exhibitions unchanged, skipping")
+            return
         
         for exhibition in exhibition_list:
             title_tag = exhibition.find('h2', class_='caption-txt')
@@ -111,18 +121,14 @@ def scrape_bampfa_exhibitions(env='prod', region='sf'):
                     'description': 'Image'
                 })
 
-            # Add logging for event details in dev environment
-            if env == 'dev':
-                logging.info(f"Event: {event_details['name']} at {event_details['venue']}")
+            yield event_details
 
-            # Process event in prod environment
-            if env == 'prod':
-                process_event(event_details, region)
+        record_fragment(url, 'li.exhibition')
 
     # Scrape current exhibitions
     current_url = 'https://bampfa.org/on-view/exhibitions?field_event_series_type_value=1'
-    process_exhibitions(current_url, 'current')
+    yield from process_exhibitions(current_url, 'current')
 
     # Scrape past exhibitions
     past_url = 'https://bampfa.org/on-view/exhibitions/past'
-    process_exhibitions(past_url, 'past')
\ No newline at end of file
+    yield from process_exhibitions(past_url, 'past')
\ No newline at end of file
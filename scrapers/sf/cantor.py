@@ -1,5 +1,5 @@
 from utils import fetch_and_parse
-from processing import process_event
+from fingerprints import fragment_due, fragment_unchanged, record_fragment
 from config import MONTH_TO_NUM_DICT
 import datetime as dt
 from datetime import timezone
@@ -20,8 +20,8 @@ def convert_date_to_dt(date_string):
         date_dt = dt.date(year, month_num, day)
     return date_dt
 
-def scrape_cantor_exhibitions(env='prod', region='sf'):
-    """Scrape and process exhibitions from the Cantor Arts Center at Stanford University."""
+def scrape_cantor_exhibitions():
+    """Scrape and yield exhibitions from the Cantor Arts Center at Stanford University."""
     
     # Create dict to map our phases to the ones used by the venue
     phase_dict = {
@@ -32,19 +32,30 @@ def scrape_cantor_exhibitions(env='prod', region='sf'):
 
     def process_exhibitions(url, phase):
         """Process exhibitions for a given URL and phase (current, future, past)."""
+        # Define class based on phase
+        phase_class = f'view--exhibitions--block-exhibitions-{phase_dict[phase]}'
+
+        # The past exhibitions archive rarely changes, only fetch it when its schedule says it is due
+        if not fragment_due(url, '.' + phase_class, phase):
+            logging.info(f"Skipping Cantor Arts Center {phase} exhibitions, not due for a check")
+            return
+
         soup = fetch_and_parse(url)
         if soup is None:
             logging.warning(f"Error scraping Cantor Arts Center {phase} exhibitions --> no soup found")
             return
         
-        # Define class based on phase
-        phase_class = f'view--exhibitions--block-exhibitions-{phase_dict[phase]}'
-        
         try:
             exhibition_section = soup.find_all('div', class_=phase_class)[0]
 
         except Exception as e:
             logging.warning(f"Error scraping Cantor Arts Center {phase} exhibitions: {e}")
+            return
+
+        # Skip the section if it is identical to the one processed last run
+        if fragment_unchanged(url, '.' + phase_class, exhibition_section):
+            logging.info(f"Cantor Arts Center {phase} exhibitions unchanged, skipping")
+            return
             
         events = exhibition_section.find_all('div', class_='container')
                         
@@ -83,22 +94,18 @@ def scrape_cantor_exhibitions(env='prod', region='sf'):
             if image_link:
                 event_details['links'].append({'link': image_link, 'description': 'Image'})
 
-            # Add logging for event details in dev environment
-            if env == 'dev':
-                logging.info(f"Processing event: {event_details.get('name')} at {event_details.get('venue')}")
-            
-            # Process event in prod environment
-            if env == 'prod':
-                process_event(event_details, region)
+            yield event_details
+
+        record_fragment(url, '.' + phase_class)
 
     # Scrape current exhibitions
     current_url = 'https://museum.stanford.edu/exhibitions'
-    process_exhibitions(current_url, 'current')
+    yield from process_exhibitions(current_url, 'current')
 
     # Scrape future exhibitions
     upcoming_url = 'https://museum.stanford.edu/exhibitions/upcoming-exhibitions'
-    process_exhibitions(upcoming_url, 'future')
+    yield from process_exhibitions(upcoming_url, 'future')
 
     # Scrape past exhibitions
     past_url = 'https://museum.stanford.edu/exhibitions/past-exhibitions'
-    process_exhibitions(past_url, 'past')
\ No newline at end of file
+    yield from process_exhibitions(past_url, 'past')
\ No newline at end of file
@@ -1,5 +1,5 @@
 from utils import fetch_and_parse
-from processing import process_event
+from fingerprints import fragment_due, fragment_unchanged, record_fragment
 from config import MONTH_TO_NUM_DICT
 import datetime as dt
 from datetime import timezone
@@ -16,8 +16,8 @@ def convert_date_to_dt(date_string):
         date_dt = dt.date(year, month_num, day)
     return date_dt
 
-def scrape_contemporary_jewish_museum(env='prod', region='sf'):
-    """Scrape and process events from Contemporary Jewish Museum."""
+def scrape_contemporary_jewish_museum():
+    """Scrape and yield events from Contemporary Jewish Museum."""
     
     # Declare list of urls
     urls = [
@@ -37,13 +37,26 @@ def scrape_contemporary_jewish_museum(env='prod', region='sf'):
     
     # Go through and collect events in each phase (current, future, and past)
     for url_dict in urls:
+
+        # The past exhibitions list rarely changes, only fetch it when its schedule says it is due
+        if not fragment_due(url_dict['url'], '.exhibitions__section', url_dict['phase']):
+            logging.info(f"Skipping Contemporary Jewish Museum {url_dict['phase']} exhibitions, not due for a check")
+            continue
     
         # Scrape info
         soup = fetch_and_parse(url_dict['url'])
+        if soup is None:
+            logging.warning(f"Error scraping Contemporary Jewish Museum {url_dict['phase']} exhibitions --> no soup found")
+            continue
                 
         # Find all events
         events_list = soup.find_all(class_='exhibitions__section')
 
+        # Skip the list if it is identical to the one processed last run
+        if events_list and fragment_unchanged(url_dict['url'], '.exhibitions__section', events_list):
+            logging.info(f"Contemporary Jewish Museum {url_dict['phase']} exhibitions unchanged, skipping")
+            continue
+
         # Check if events is found
         if events_list:
             
@@ -106,13 +119,9 @@ def scrape_contemporary_jewish_museum(env='prod', region='sf'):
                         'description': 'Image'
                     })
 
-                # Add dev environment logging
-                if env == 'dev':
-                    logging.info(f"Event found: {event_details['name']} at {event_details['venue']}")
+                yield event_details
 
-                # Process event in prod environment
-                if env == 'prod':
-                    process_event(event_details, region)
+            record_fragment(url_dict['url'], '.exhibitions__section')
 
         else:
             logging.warning(f"Events not found for phase: {url_dict['phase']}")
\ No newline at end of file
@@ -1,5 +1,4 @@
 from utils import fetch_and_parse
-from processing import process_event
 from config import MONTH_TO_NUM_DICT
 import datetime as dt
 from datetime import timezone
@@ -16,8 +15,8 @@ def convert_date_to_dt(date_string):
         date_dt = dt.date(year, month_num, day)
     return date_dt
 
-def scrape_de_young_and_legion_of_honor(env='prod', region='sf'):
-    """Scrape and process events from the de Young and Legion of Honor."""
+def scrape_de_young_and_legion_of_honor():
+    """Scrape and yield events from the de Young and Legion of Honor."""
 
     # Declare list of url dicts and then iterate through them
     urls = [
@@ -119,12 +118,7 @@ def scrape_de_young_and_legion_of_honor(env='prod', region='sf'):
                                 'description': 'Image'
                             })
 
-                        # Log event details in dev environment
-                        if env == 'dev':
-                            logging.info(f"Event found: {event_details['name']} at {event_details['venue']}")
-
-                        if env == 'prod':
-                            process_event(event_details, region)
+                        yield event_details
 
                     except Exception as e:
                         logging.error(f"Error processing element for {u['venue']}: {e}", exc_info=True)
\ No newline at end of file
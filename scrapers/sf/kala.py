@@ -1,5 +1,4 @@
 from utils import fetch_and_parse
-from processing import process_event
 from config import MONTH_TO_NUM_DICT
 import datetime as dt
 from datetime import timezone
@@ -33,13 +32,13 @@ def convert_date_to_dt(date_text):
     # Create the date object
     return dt.date(year, month, day)
 
-def scrape_kala_exhibitions(env='prod', region='sf'):
-    """Scrape and process exhibitions from the Kala Art Institute."""
+def scrape_kala_exhibitions():
+    """Scrape and yield exhibitions from the Kala Art Institute."""
     
     url = 'https://www.kala.org/gallery/exhibitions/'
     soup = fetch_and_parse(url)
     if soup is None:
-        logging.ingo('Error scraping Kala exhibitions')
+        logging.warning('Error scraping Kala exhibitions')
         return
 
     # Find current exhibitions
@@ -78,12 +77,7 @@ def scrape_kala_exhibitions(env='prod', region='sf'):
             if image_link:
                 event_details['links'].append({'link': image_link, 'description': 'Image'})
 
-            # Process event in dev environment
-            if env == 'dev':
-                logging.info(f"Event details - Name: {event_details['name']}, Venue: {event_details['venue']}")
-
-            if env == 'prod':
-                process_event(event_details, region)
+            yield event_details
 
         except AttributeError as e:
             logging.info(f"Error parsing element: {e}")
\ No newline at end of file
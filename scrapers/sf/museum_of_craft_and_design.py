@@ -1,5 +1,4 @@
 from utils import fetch_and_parse
-from processing import process_event
 from config import MONTH_TO_NUM_DICT
 import datetime as dt
 from datetime import timezone
@@ -16,8 +15,8 @@ def convert_date_to_dt(date_string):
     else:
         return None
 
-def scrape_museum_of_craft_and_design_exhibitions(env='prod', region='sf'):
-    """Scrape and process exhibitions from the Museum of Craft and Design."""
+def scrape_museum_of_craft_and_design_exhibitions():
+    """Scrape and yield exhibitions from the Museum of Craft and Design."""
     
     def process_exhibitions(url, phase, class_name):
         """Process exhibitions from the given URL for the specified phase."""
@@ -111,18 +110,13 @@ def scrape_museum_of_craft_and_design_exhibitions(env='prod', region='sf'):
             if image_link:
                 event_details['links'].append({'link': image_link, 'description': 'Image'})
 
-            # Log event details in dev environment
-            if env == 'dev':
-                logging.info(f"Event: {event_details.get('name')} at {event_details.get('venue')}")
-
-            if env == 'prod':
-                process_event(event_details, region)
+            yield event_details
 
     # Scrape current exhibitions
-    process_exhibitions('https://sfmcd.org/exhibitions/', 'current', 'colcustom1')
+    yield from process_exhibitions('https://sfmcd.org/exhibitions/', 'current', 'colcustom1')
 
     # Scrape upcoming exhibitions
-    process_exhibitions('https://sfmcd.org/upcoming-exhibitions/', 'future', 'colcustom2')
+    yield from process_exhibitions('https://sfmcd.org/upcoming-exhibitions/', 'future', 'colcustom2')
 
     # Scrape past exhibitions
-    process_exhibitions('https://sfmcd.org/past-exhibitions/', 'past', 'colcustom4')
+    yield from process_exhibitions('https://sfmcd.org/past-exhibitions/', 'past', 'colcustom4')
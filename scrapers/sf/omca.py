@@ -1,5 +1,5 @@
-from utils import fetch_and_parse
-from processing import process_event
+from utils import fetch_and_parse, fetch_many
+from detail_cache import cached_details, store_details
 from config import MONTH_TO_NUM_DICT
 import datetime as dt
 from datetime import timezone
@@ -33,13 +33,12 @@ def convert_date_to_dt(date_text):
     # Create the date object
     return dt.date(year, month, day)
 
-def scrape_oak_museum_of_ca_exhibitions(env='prod', region='sf'):
-    """Scrape and process events from the Oakland Museum of California (OMCA)."""
+def scrape_oak_museum_of_ca_exhibitions():
+    """Scrape and yield events from the Oakland Museum of California (OMCA)."""
     
-    def fetch_event_details(event_url):
-        """Fetch and parse details from the event's page."""
+    def fetch_event_details(event_url, event_soup):
+        """Parse details from the event's (already fetched) page."""
         
-        event_soup = fetch_and_parse(event_url)
         if not event_soup:
             return None, None, None
 
@@ -103,6 +102,16 @@ def scrape_oak_museum_of_ca_exhibitions(env='prod', region='sf'):
 
     exhibition_elements = soup.find_all('div', class_='post-tile post-tile_type-on-view')
 
+    # Reuse the dates of events whose tile is unchanged and cache entry hasn't expired,
+    # fetch the other event pages up front and concurrently
+    event_links = []
+    for elem in exhibition_elements:
+        event_link_tag = elem.find('a', class_='post-tile__inner', href=True)
+        event_links.append(event_link_tag['href'] if event_link_tag else None)
+    cached = {link: cached_details(link, elem) for link, elem in zip(event_links, exhibition_elements)}
+    links_to_fetch = [link for link in event_links if cached[link] is None]
+    event_soups = dict(zip(links_to_fetch, fetch_many(links_to_fetch)))
+
     for elem in exhibition_elements:
         try:
             # Extract title
@@ -120,7 +129,11 @@ def scrape_oak_museum_of_ca_exhibitions(env='prod', region='sf'):
             event_link = event_link_tag['href'] if event_link_tag else None
             
             # Extract dates
-            start_date, end_date, ongoing = fetch_event_details(event_link)
+            details = cached.get(event_link)
+            if details is None:
+                start_date, end_date, ongoing = fetch_event_details(event_link, event_soups.get(event_link))
+            else:
+                start_date, end_date, ongoing = details
 
             # Extract image link
             image_tag = elem.find('img', src=True)
@@ -140,6 +153,9 @@ def scrape_oak_museum_of_ca_exhibitions(env='prod', region='sf'):
             else:
                 phase = None
 
+            if details is None and event_soups.get(event_link) is not None:
+                store_details(event_link, elem, phase, [start_date, end_date, ongoing])
+
             event_details = {
                 'name': title,
                 'venue': 'Oakland Museum of California',
@@ -156,12 +172,7 @@ def scrape_oak_museum_of_ca_exhibitions(env='prod', region='sf'):
             if image_link:
                 event_details['links'].append({'link': image_link, 'description': 'Image'})
 
-            # Add logging for dev environment
-            if env == 'dev':
-                logging.info(f"Event found: {event_details['name']} at {event_details['venue']}")
-
-            if env == 'prod':
-                process_event(event_details, region)
+            yield event_details
 
         except Exception as e:
             logging.warning(f"Error parsing element of url {event_link}: {e}")
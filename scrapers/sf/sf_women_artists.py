@@ -1,15 +1,16 @@
-from utils import fetch_and_parse
-from processing import process_event
+from utils import fetch_and_parse, fetch_many
+from detail_cache import cached_details, store_details
 from config import MONTH_TO_NUM_DICT
 import datetime as dt
 from datetime import timezone
 import logging
 
-def scrape_event_specific_page(event_url):
-    """Given the url for a specific event, scrape info"""
+def scrape_event_specific_page(event_url, soup=None):
+    """Given the url for a specific event (and optionally its fetched soup), scrape info"""
 
     # Scrape info and collect events
-    soup = fetch_and_parse(event_url)
+    if soup is None:
+        soup = fetch_and_parse(event_url)
 
     # Find all <p> elements within <header class="article-header">
     header = soup.find('header', class_='article-header')
@@ -59,14 +60,17 @@ def convert_date_to_nums(date_string):
         logging.warning(f"Error converting date string '{date_string}': {str(e)}")
         return None, None
 
-def scrape_sfwomenartists(env='prod', region='sf'):
-    """Scrape and process events from San Francisco Women Artists Gallery."""
+def scrape_sfwomenartists():
+    """Scrape and yield events from San Francisco Women Artists Gallery."""
     
     # Declare url
     url = 'https://www.sfwomenartists.org/exhibitions/'
     
     # Scrape info and collect events
     soup = fetch_and_parse(url)
+    if soup is None:
+        logging.warning('Error scraping San Francisco Women Artists Gallery --> no soup found')
+        return
     
     # Get google maps link for venue
     gmaps_link = soup.find('p').find('a')['href'].strip()
@@ -76,13 +80,26 @@ def scrape_sfwomenartists(env='prod', region='sf'):
 
     # Check if events is found
     if events_list:
-        for event in events_list:
-            # Extract title and title-link
+        # Reuse the details of events whose listing is unchanged and cache entry hasn't expired,
+        # fetch the other event pages up front and concurrently
+        event_links = [event.find('a')['href'].strip() for event in events_list]
+        cached = [cached_details(link, event) for link, event in zip(event_links, events_list)]
+        links_to_fetch = [link for link, details in zip(event_links, cached) if details is None]
+        fetched = dict(zip(links_to_fetch, fetch_many(links_to_fetch)))
+
+        for event, event_link, details in zip(events_list, event_links, cached):
+            # Extract title
             event_title = event.find('h4', class_='gallery-title').text.strip()
-            event_link = event.find('a')['href'].strip()
             
             # Scrape additional info from event url
-            event_dates, event_description, image_link = scrape_event_specific_page(event_link)
+            if details is None:
+                event_soup = fetched[event_link]
+                if event_soup is None:
+                    logging.warning(f"Could not fetch event page for: {event_title} at {event_link}")
+                    continue
+                event_dates, event_description, image_link = scrape_event_specific_page(event_link, event_soup)
+            else:
+                event_dates, event_description, image_link = details
             # Skip to the next event if end date does not exist
             if not event_dates:
                 logging.warning(f"No valid dates found for event: {event_title} at {event_link}")
@@ -153,6 +170,9 @@ def scrape_sfwomenartists(env='prod', region='sf'):
             else:
                 phase = None
 
+            if details is None:
+                store_details(event_link, event, phase, [event_dates, event_description, image_link])
+
             event_details = {
                 'name': event_title,
                 'venue': 'San Francisco Women Artists Gallery',
@@ -177,13 +197,7 @@ def scrape_sfwomenartists(env='prod', region='sf'):
                     'description': 'Image'
                 })
             
-            # Add debug logging for dev environment
-            if env == 'dev':
-                logging.info(f"Event found: {event_details.get('name')} at {event_details.get('venue')}")
-            
-            # Process event in prod environment
-            if env == 'prod':
-                process_event(event_details, region)
+            yield event_details
 
     else:
         logging.warning(f"Events not found for San Francisco Women Artists Gallery")
\ No newline at end of file
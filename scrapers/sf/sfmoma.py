@@ -1,11 +1,16 @@
+from bs4 import SoupStrainer
 from utils import fetch_and_parse
-from processing import process_event
+from fingerprints import fragment_unchanged, record_fragment
 from config import MONTH_TO_NUM_DICT
 import datetime as dt
 from datetime import timezone
 from unicodedata import normalize
 import logging
 
+# The exhibitions page is only read inside the current, upcoming and past grids
+EXHIBITIONS_REGION = SoupStrainer('div', id=['item--exhibitions-current', 'item--exhibitions-upcoming',
+                                             'item--exhibitions-past'])
+
 def convert_date_to_dt(date_string):
     """Takes a date in string form and converts it to a dt object"""
 
@@ -17,8 +22,8 @@ def convert_date_to_dt(date_string):
         date_dt = dt.date(year, month_num, day)
     return date_dt
 
-def scrape_sfmoma(env='prod', region='sf'):
-    """Scrape and process events from SFMOMA."""
+def scrape_sfmoma():
+    """Scrape and yield events from SFMOMA."""
     
     # Declare url
     url = 'https://www.sfmoma.org/exhibitions/'
@@ -40,7 +45,7 @@ def scrape_sfmoma(env='prod', region='sf'):
     ]
     
     # Scrape info
-    soup = fetch_and_parse(url)
+    soup = fetch_and_parse(url, parse_only=EXHIBITIONS_REGION)
     if not soup:
         logging.error("Failed to fetch SFMOMA exhibitions page")
         return
@@ -55,6 +60,13 @@ def scrape_sfmoma(env='prod', region='sf'):
             logging.warning(f"Events container not found for phase: {phase_dict['phase']}")
             continue
 
+        # Skip the grid if it is identical to the one processed last run
+        selector = '#' + phase_dict['id']
+        if fragment_unchanged(url, selector, events_container):
+            logging.info(f"SFMOMA {phase_dict['phase']} exhibitions unchanged, skipping")
+            continue
+        failed = False
+
         # Find all direct child divs that are assumed to represent individual events
         individual_events = events_container.find_all('a', class_='exhibitionsgrid-wrapper-grid-item')
 
@@ -166,13 +178,12 @@ def scrape_sfmoma(env='prod', region='sf'):
                     'last_updated': dt.datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
                 }
 
-                # Add logging for dev environment
-                if env == 'dev':
-                    logging.info(f"Event details - Name: {event_details['name']}, Venue: {event_details['venue']}")
-
-                # Process event in prod environment
-                if env == 'prod':
-                    process_event(event_details, region)
+                yield event_details
 
             except Exception as e:
                 logging.error(f"Error processing event: {e}", exc_info=True)
+                failed = True
+
+        # Only remember the grid once all of its events were processed
+        if not failed:
+            record_fragment(url, selector)
@@ -1,5 +1,4 @@
 from utils import fetch_and_parse
-from processing import process_event
 from config import MONTH_TO_NUM_DICT
 import datetime as dt
 from datetime import timezone
@@ -16,8 +15,8 @@ def convert_date_to_dt(date_string):
     else:
         return None
 
-def scrape_sj_museum_of_art_exhibitions(env='prod', region='sj'):
-    """Scrape and process exhibitions from the San Jose Museum of Art."""
+def scrape_sj_museum_of_art_exhibitions():
+    """Scrape and yield exhibitions from the San Jose Museum of Art."""
     
     def process_exhibitions(url, phase):
         """Process exhibitions from the given URL for the specified phase."""
@@ -92,18 +91,13 @@ def scrape_sj_museum_of_art_exhibitions(env='prod', region='sj'):
             if image_link:
                 event_details['links'].append({'link': image_link, 'description': 'Image'})
 
-            # Add logging for dev environment
-            logging.info(f"Event details in dev - Name: {event_details.get('name')}, Venue: {event_details.get('venue')}")
-
-            # Process event in prod environment
-            if env == 'prod':
-                process_event(event_details, region)
+            yield event_details
 
     # On View Exhibitions
-    process_exhibitions('https://sjmusart.org/exhibitions-on-view', 'current')
+    yield from process_exhibitions('https://sjmusart.org/exhibitions-on-view', 'current')
 
     # Upcoming Exhibitions
-    process_exhibitions('https://sjmusart.org/upcoming-exhibitions', 'future')
+    yield from process_exhibitions('https://sjmusart.org/upcoming-exhibitions', 'future')
 
     # Past Exhibitions
-    process_exhibitions('https://sjmusart.org/past-exhibitions', 'past')
+    yield from process_exhibitions('https://sjmusart.org/past-exhibitions', 'past')
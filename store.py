@@ -0,0 +1,401 @@
+import logging
+import os
+import sqlite3
+from collections import Counter
+from contextlib import contextmanager
+import codec
+from config import DB_FILES, DB_BACKEND, SQLITE_DB_FILES, DB_JOURNAL, JOURNAL_COMPACT_ENTRIES, \
+    JOURNAL_COMPACT_BYTES, DB_LAYOUT, SHARD_EXPORT_MONOLITHIC
+from utils import load_db, save_db, append_journal, journal_size, journal_path, compact_db, load_manifest, load_shard, \
+    save_shards, phase_settled, file_digest
+
+# Stores opened by main.main for the duration of a run, keyed by region
+_open_stores = {}
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    venue TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    phase TEXT,
+    start_date TEXT,
+    end_date TEXT,
+    hash TEXT,
+    record TEXT NOT NULL,
+    UNIQUE (venue, event_id)
+);
+CREATE INDEX IF NOT EXISTS idx_events_venue ON events (venue);
+CREATE INDEX IF NOT EXISTS idx_events_event_id ON events (event_id);
+CREATE INDEX IF NOT EXISTS idx_events_phase ON events (phase);
+CREATE INDEX IF NOT EXISTS idx_events_start_date ON events (start_date);
+CREATE INDEX IF NOT EXISTS idx_events_end_date ON events (end_date);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+SQLITE_UPSERT = """
+INSERT INTO events (venue, event_id, phase, start_date, end_date, hash, record)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (venue, event_id) DO UPDATE SET
+    phase = excluded.phase,
+    start_date = excluded.start_date,
+    end_date = excluded.end_date,
+    hash = excluded.hash,
+    record = excluded.record
+"""
+
+def _ended_before(event, cutoff):
+    """Check if an event's end date (date object or ISO string) is before an ISO date string."""
+    end_date = (event.get('dates') or {}).get('end')
+    return bool(end_date) and str(end_date) < cutoff
+
+def _matches(event, ended_before, skip_past):
+    return ((ended_before is None or _ended_before(event, ended_before))
+            and not (skip_past and phase_settled(event)))
+
+class EventStore:
+    """In-memory view of a region's event db that is written back to disk in one go.
+
+    With journal=True each put is appended to the region's journal as it happens, and
+    flush only rewrites the snapshot once the journal is big enough to compact. The journal
+    is always folded into the snapshot when the store is closed, so the site (which only
+    reads the snapshot) sees every event by the end of the run.
+    """
+
+    def __init__(self, region, checkpoint_every=None, journal=None):
+        self.region = region
+        self.checkpoint_every = checkpoint_every
+        self.journal = DB_JOURNAL if journal is None else journal
+        self.db = load_db(DB_FILES[region])
+        self.pending = 0
+        self.dirty = False
+        # Outcome counts for the run ('added', 'changed', 'unchanged'), filled in by processing.upsert_event
+        self.stats = Counter()
+
+    def get(self, venue, event_id):
+        """Return the stored record for an event, or None if it is not in the db."""
+        return self.db.get(venue, {}).get(event_id)
+
+    def put(self, venue, event_id, record):
+        """Insert or replace an event record in memory, flushing at checkpoints."""
+        self.db.setdefault(venue, {})[event_id] = record
+        if self.journal:
+            append_journal(self.region, venue, event_id, record)
+        self.dirty = True
+        self.pending += 1
+        if self.checkpoint_every and self.pending >= self.checkpoint_every:
+            self.flush()
+
+    def iter_events(self, ended_before=None, skip_past=False):
+        """Yield (venue, event_id, record) for every event, optionally only those ending before an ISO date.
+
+        skip_past leaves out events already settled in the 'past' phase (see phase_settled).
+        """
+        for venue, events in self.db.items():
+            for event_id, event in events.items():
+                if _matches(event, ended_before, skip_past):
+                    yield venue, event_id, event
+
+    def count_venues(self):
+        return len(self.db)
+
+    def count_events(self):
+        return sum(len(events) for events in self.db.values())
+
+    def flush(self):
+        """Write the db to disk if anything changed since the last flush."""
+        if not self.dirty:
+            return
+        if self.journal:
+            # Writes are already on disk in the journal, only fold it into the snapshot when it has grown
+            entries, size = journal_size(self.region)
+            if entries >= JOURNAL_COMPACT_ENTRIES or size >= JOURNAL_COMPACT_BYTES:
+                compact_db(self.db, self.region)
+        else:
+            save_db(self.db, self.region)
+        logging.debug(f"[{self.region}] Flushed {self.pending} pending event writes")
+        self.pending = 0
+        self.dirty = False
+
+    def close(self):
+        if self.journal and os.path.exists(journal_path(DB_FILES[self.region])):
+            compact_db(self.db, self.region)
+
+class ShardedEventStore:
+    """Event store over one file per venue, loading shards on first use and rewriting only changed ones.
+
+    Has the same interface as EventStore. The first time a region is opened with the sharded
+    layout its shards are created from the monolithic DB_FILES file. With SHARD_EXPORT_MONOLITHIC
+    the DB_FILES file is regenerated once, when the store is closed after shards were rewritten.
+    """
+
+    def __init__(self, region, checkpoint_every=None):
+        self.region = region
+        self.checkpoint_every = checkpoint_every
+        self.manifest = load_manifest(region)
+        if self.manifest is None:
+            save_shards(load_db(DB_FILES[region]), region)
+            self.manifest = load_manifest(region)
+            logging.info(f"Database for {region} split into {len(self.manifest)} venue shards")
+        # Loaded shards, keyed by venue in manifest order
+        self.db = {}
+        self.dirty_venues = set()
+        self.pending = 0
+        self.dirty = False
+        # Set once a flush rewrote any shard, so close() knows the monolithic export is stale
+        self.export_stale = not os.path.exists(DB_FILES[region])
+        self.stats = Counter()
+
+    def _venue_events(self, venue):
+        """Return the events dict for a venue, loading its shard the first time it is needed."""
+        if venue not in self.db and venue in self.manifest:
+            self.db[venue] = load_shard(self.region, venue, self.manifest)
+        return self.db.setdefault(venue, {})
+
+    def get(self, venue, event_id):
+        """Return the stored record for an event, or None if it is not in the db."""
+        if venue not in self.db and venue not in self.manifest:
+            return None
+        return self._venue_events(venue).get(event_id)
+
+    def put(self, venue, event_id, record):
+        """Insert or replace an event record in memory, flushing at checkpoints."""
+        self._venue_events(venue)[event_id] = record
+        self.dirty_venues.add(venue)
+        self.dirty = True
+        self.pending += 1
+        if self.checkpoint_every and self.pending >= self.checkpoint_every:
+            self.flush()
+
+    def iter_events(self, ended_before=None, skip_past=False):
+        """Yield (venue, event_id, record) for every event, optionally only those ending before an ISO date.
+
+        skip_past leaves out events already settled in the 'past' phase (see phase_settled). With
+        both filters, shards that aren't loaded yet are only read if their manifest entry says
+        they have an unsettled event ending before the date.
+        """
+        for venue in list(self.manifest) + [venue for venue in self.db if venue not in self.manifest]:
+            if venue not in self.db and ended_before is not None and skip_past:
+                next_end = self.manifest[venue].get('next_end', '')
+                if next_end is None or (next_end and next_end >= ended_before):
+                    continue
+            for event_id, event in self._venue_events(venue).items():
+                if _matches(event, ended_before, skip_past):
+                    yield venue, event_id, event
+
+    def count_venues(self):
+        return len(set(self.manifest) | set(self.db))
+
+    def count_events(self):
+        # Use the manifest counts for shards that were never loaded
+        return sum(len(self.db[venue]) if venue in self.db else self.manifest[venue]['count']
+                   for venue in set(self.manifest) | set(self.db))
+
+    def flush(self):
+        """Rewrite the shards of venues that changed."""
+        if not self.dirty:
+            return
+        written = save_shards(self.db, self.region, venues=sorted(self.dirty_venues))
+        self.manifest = load_manifest(self.region)
+        self.export_stale = self.export_stale or written > 0
+        logging.debug(f"[{self.region}] Flushed {self.pending} pending event writes to {written} shards")
+        self.dirty_venues = set()
+        self.pending = 0
+        self.dirty = False
+
+    def close(self):
+        if SHARD_EXPORT_MONOLITHIC and self.export_stale:
+            # Shards already in memory are used as they are, only the others are read from disk
+            save_db({venue: self._venue_events(venue) for venue in self.manifest}, self.region)
+            self.export_stale = False
+
+class SQLiteEventStore:
+    """Event store backed by an indexed SQLite db, with batched transactional upserts.
+
+    Has the same interface as EventStore. Each flush commits the pending batch and
+    re-exports DB_FILES[region] so the static site keeps reading the same JSON file.
+    """
+
+    def __init__(self, region, checkpoint_every=None):
+        self.region = region
+        self.checkpoint_every = checkpoint_every
+        self.conn = connect_sqlite_db(SQLITE_DB_FILES[region], seed_from=DB_FILES[region])
+        self.batch = {}
+        self.pending = 0
+        self.dirty = False
+        self.stats = Counter()
+
+    def get(self, venue, event_id):
+        """Return the stored record for an event, or None if it is not in the db."""
+        if (venue, event_id) in self.batch:
+            return self.batch[(venue, event_id)]
+        row = self.conn.execute(
+            "SELECT record FROM events WHERE venue = ? AND event_id = ?", (venue, event_id)
+        ).fetchone()
+        return codec.loads(row[0]) if row else None
+
+    def put(self, venue, event_id, record):
+        """Queue an event record for the next batch upsert, flushing at checkpoints."""
+        self.batch[(venue, event_id)] = record
+        self.dirty = True
+        self.pending += 1
+        if self.checkpoint_every and self.pending >= self.checkpoint_every:
+            self.flush()
+
+    def iter_events(self, ended_before=None, skip_past=False):
+        """Yield (venue, event_id, record) for every event, optionally only those ending before an ISO date.
+
+        skip_past leaves out events already settled in the 'past' phase (see phase_settled).
+        """
+        self._commit_batch()
+        query = "SELECT venue, event_id, record FROM events"
+        params = ()
+        if ended_before is not None:
+            # Uses idx_events_end_date instead of decoding every record
+            query += " WHERE end_date IS NOT NULL AND end_date != '' AND end_date < ?"
+            params = (ended_before,)
+        for venue, event_id, record in self.conn.execute(query + " ORDER BY id", params).fetchall():
+            event = codec.loads(record)
+            if not (skip_past and phase_settled(event)):
+                yield venue, event_id, event
+
+    def count_venues(self):
+        self._commit_batch()
+        return self.conn.execute("SELECT COUNT(DISTINCT venue) FROM events").fetchone()[0]
+
+    def count_events(self):
+        self._commit_batch()
+        return self.conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def _commit_batch(self):
+        """Upsert all queued records in a single transaction."""
+        if not self.batch:
+            return
+        upsert_sqlite_events(self.conn, (
+            (venue, event_id, record) for (venue, event_id), record in self.batch.items()
+        ))
+        self.batch = {}
+
+    def flush(self):
+        """Commit queued records and re-export the region's JSON file if anything changed."""
+        if not self.dirty:
+            return
+        self._commit_batch()
+        export_sqlite_db(self.conn, self.region)
+        logging.debug(f"[{self.region}] Flushed {self.pending} pending event writes to SQLite")
+        self.pending = 0
+        self.dirty = False
+
+    def close(self):
+        self.conn.close()
+
+def _sqlite_row(venue, event_id, record):
+    """Build the column values for an event record, with the record itself stored as JSON text."""
+    dates = record.get('dates') or {}
+    start_date = dates.get('start')
+    end_date = dates.get('end')
+    return (
+        venue,
+        event_id,
+        record.get('phase'),
+        str(start_date) if start_date else None,
+        str(end_date) if end_date else None,
+        record.get('hash'),
+        codec.dumps(record, pretty=False).decode('utf-8'),
+    )
+
+def _json_db_digest(filepath):
+    """Identify the current content of a JSON db file and its journal."""
+    return f"{file_digest(filepath)}:{file_digest(journal_path(filepath))}"
+
+def _record_seed_digest(conn, seed_from):
+    """Remember which version of the JSON db the SQLite db is in sync with."""
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('seed_digest', ?)",
+                     (_json_db_digest(seed_from),))
+
+def connect_sqlite_db(filepath, seed_from=None):
+    """Open (and create if needed) a SQLite event db, seeding it from a JSON db file.
+
+    The db is (re)seeded whenever the JSON file differs from the version it was last seeded from
+    or exported to, e.g. after a pull brought in a newer JSON db, so stale SQLite contents are
+    never exported over it.
+    """
+    os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+    conn = sqlite3.connect(filepath)
+    conn.executescript(SQLITE_SCHEMA)
+    if seed_from:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'seed_digest'").fetchone()
+        if row is None or row[0] != _json_db_digest(seed_from):
+            db = load_db(seed_from)
+            with conn:
+                conn.execute("DELETE FROM events")
+                conn.executemany(SQLITE_UPSERT, (
+                    _sqlite_row(venue, event_id, event) for venue, events in db.items() for event_id, event in events.items()
+                ))
+            _record_seed_digest(conn, seed_from)
+            logging.info(f"Database seeded {filepath} from {seed_from}")
+    return conn
+
+def upsert_sqlite_events(conn, events):
+    """Insert or update (venue, event_id, record) tuples in one transaction."""
+    with conn:
+        conn.executemany(SQLITE_UPSERT, (_sqlite_row(*event) for event in events))
+
+def load_sqlite_db(filepath):
+    """Load a SQLite event db into the nested {venue: {event_id: record}} dict that load_db returns."""
+    conn = connect_sqlite_db(filepath)
+    try:
+        return _sqlite_to_dict(conn)
+    finally:
+        conn.close()
+
+def save_sqlite_db(db, region):
+    """Replace the contents of a region's SQLite db with a nested dict, like save_db does for JSON."""
+    conn = connect_sqlite_db(SQLITE_DB_FILES[region])
+    try:
+        with conn:
+            conn.execute("DELETE FROM events")
+            conn.executemany(SQLITE_UPSERT, (
+                _sqlite_row(venue, event_id, event) for venue, events in db.items() for event_id, event in events.items()
+            ))
+    finally:
+        conn.close()
+
+def _sqlite_to_dict(conn):
+    # Rows come back in insertion order, so venues and events keep the order they have in the JSON file
+    db = {}
+    for venue, event_id, record in conn.execute("SELECT venue, event_id, record FROM events ORDER BY id"):
+        db.setdefault(venue, {})[event_id] = codec.loads(record)
+    return db
+
+def export_sqlite_db(conn, region):
+    """Regenerate docs/data/{region}_events.json from the SQLite db for the frontend."""
+    save_db(_sqlite_to_dict(conn), region)
+    _record_seed_digest(conn, DB_FILES[region])
+
+def create_store(region, checkpoint_every=None, backend=None):
+    """Create an event store for a region using the configured (or given) backend."""
+    if (backend or DB_BACKEND) == 'sqlite':
+        return SQLiteEventStore(region, checkpoint_every=checkpoint_every)
+    if DB_LAYOUT == 'sharded':
+        return ShardedEventStore(region, checkpoint_every=checkpoint_every)
+    return EventStore(region, checkpoint_every=checkpoint_every)
+
+@contextmanager
+def open_store(region, checkpoint_every=None, backend=None):
+    """Open a run-scoped store for a region so process_event writes to memory instead of disk."""
+    store = create_store(region, checkpoint_every=checkpoint_every, backend=backend)
+    _open_stores[region] = store
+    try:
+        yield store
+    finally:
+        del _open_stores[region]
+        store.flush()
+        store.close()
+
+def get_open_store(region):
+    """Return the store opened for a region by open_store, or None if there is none."""
+    return _open_stores.get(region)
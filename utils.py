@@ -1,27 +1,42 @@
 import json
-import numpy as np
+import hashlib
+import re
+import shutil
+import tempfile
+import zipfile
+import io
+import importlib.util
+import threading
+import time
+import random
+import contextvars
 import logging
 import requests
-from bs4 import BeautifulSoup
-from config import DB_FILES
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+from email.utils import parsedate_to_datetime
+from collections import Counter, defaultdict, namedtuple
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from config import DB_FILES, DB_JSON_COMPACT, SHARD_DIRS, USER_AGENT, HTTP_TIMEOUT, HTTP_POOL_CONNECTIONS, \
+    HTTP_POOL_MAXSIZE, HTTP_HOST_POOL_SIZES, HOST_MAX_CONCURRENCY, HOST_RATE, HOST_BURST, HONOR_CRAWL_DELAY, \
+    RETRY_AFTER_MAX_S, FETCH_MAX_WORKERS, HTTP_RETRIES, HTTP_RETRY_STATUSES, HTTP_BACKOFF_BASE_S, HTTP_BACKOFF_MAX_S, \
+    CIRCUIT_BREAKER_THRESHOLD, CIRCUIT_BREAKER_COOLDOWN_S, HTML_PARSER, HTML_PARSER_OVERRIDES, \
+    HTTP_CACHE_DIR, HTTP_CACHE_MAX_BYTES
 import os
-
-def convert_nan_to_none(data):
-    if isinstance(data, dict):
-        return {k: convert_nan_to_none(v) for k, v in data.items()}
-    elif isinstance(data, list):
-        return [convert_nan_to_none(i) for i in data]
-    elif isinstance(data, float) and np.isnan(data):
-        return None
-    else:
-        return data
+import codec
 
 def load_db(filepath):
+    db = load_snapshot(filepath)
+    # Apply any upserts journaled since the snapshot was last compacted
+    replay_journal(db, filepath)
+    return db
+
+def load_snapshot(filepath):
     try:
-        # Try to read the file first
-        with open(filepath, 'r') as file:
-            db = json.load(file)
-            return convert_nan_to_none(db)
+        # Try to read the file first (the codec decodes NaN values as None)
+        return codec.load(filepath)
     except FileNotFoundError:
         # File doesn't exist - try to create it
         try:
@@ -41,15 +56,933 @@ def save_db(db, region):
     # Get the correct file path from DB_FILES using the region
     db_path = DB_FILES[region]
 
-    with open(db_path, 'w') as file:
-        json.dump(db, file, indent=4, default=str)
+    data = codec.dumps(db, pretty=not DB_JSON_COMPACT)
+    return write_file_atomic(db_path, data)
+
+def shard_filename(venue):
+    """Return the shard file name for a venue, e.g. 'Asian Art Museum' -> 'asian-art-museum.json'."""
+    return re.sub(r'[^a-z0-9]+', '-', venue.lower()).strip('-') + '.json'
+
+def manifest_path(region):
+    return os.path.join(SHARD_DIRS[region], 'manifest.json')
+
+def load_manifest(region):
+    """Return the region's shard manifest ({venue: {'file', 'count', 'hash'}}), or None if it isn't sharded yet."""
+    try:
+        return codec.load(manifest_path(region))['shards']
+    except FileNotFoundError:
+        return None
+
+def load_shard(region, venue, manifest):
+    """Load one venue's events from its shard file."""
+    return codec.load(os.path.join(SHARD_DIRS[region], manifest[venue]['file']))
+
+def load_shards(region, venues=None):
+    """Load the region's sharded db, reading only the shards for the given venues (all of them by default)."""
+    manifest = load_manifest(region) or {}
+    return {
+        venue: load_shard(region, venue, manifest)
+        for venue in manifest
+        if venues is None or venue in venues
+    }
+
+def phase_settled(event):
+    """Check if an event is already fully in the 'past' phase, so a phase update can't change it."""
+    tags = event.get('tags') or []
+    return event.get('phase') == 'past' and not event.get('ongoing') and 'past' in tags and 'current' not in tags
+
+def save_shards(db, region, venues=None):
+    """Write the shards for the given venues (all venues in db by default) and update the manifest.
+
+    Each manifest entry also records 'next_end', the earliest end date of the venue's events
+    not yet settled in the past phase, so phase updates can skip shards without loading them.
+    Returns the number of shard files that were actually rewritten.
+    """
+    manifest = load_manifest(region) or {}
+    written = 0
+    for venue in (db if venues is None else venues):
+        data = codec.dumps(db[venue], pretty=not DB_JSON_COMPACT)
+        filename = manifest.get(venue, {}).get('file') or shard_filename(venue)
+        if write_file_atomic(os.path.join(SHARD_DIRS[region], filename), data):
+            written += 1
+        end_dates = [str(event['dates']['end']) for event in db[venue].values()
+                     if (event.get('dates') or {}).get('end') and not phase_settled(event)]
+        manifest[venue] = {
+            'file': filename,
+            'count': len(db[venue]),
+            'hash': hashlib.sha256(data).hexdigest(),
+            'next_end': min(end_dates, default=None),
+        }
+    write_file_atomic(manifest_path(region), codec.dumps({'shards': manifest}, pretty=True))
+    return written
+
+def export_monolithic(region):
+    """Regenerate the single-file DB_FILES[region] from the region's shards."""
+    return save_db(load_shards(region), region)
+
+def file_digest(filepath):
+    """Return the sha256 hex digest of a file's contents, or None if it doesn't exist."""
+    try:
+        with open(filepath, 'rb') as file:
+            return hashlib.sha256(file.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+def write_file_atomic(filepath, data):
+    """Write bytes to a file unless it already has exactly that content. Returns True if the file was written.
+
+    The data goes to a temp file in the same directory, is fsynced and then renamed over the
+    target, so a crash mid-write leaves either the old file or the new one, never a truncated one.
+    """
+    if file_digest(filepath) == hashlib.sha256(data).hexdigest():
+        logging.debug(f"Skipping write of {filepath}, content unchanged")
+        return False
+
+    directory = os.path.dirname(filepath) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(filepath)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        # mkstemp creates the file as 0600, keep the permissions of the file being replaced
+        try:
+            mode = os.stat(filepath).st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o644
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    # Persist the rename itself (not supported on every platform)
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return True
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+    return True
+
+def journal_path(filepath):
+    """Return the path of the change journal that belongs to a db snapshot file."""
+    return os.path.splitext(filepath)[0] + '.journal.jsonl'
+
+def replay_journal(db, filepath):
+    """Apply journaled upserts to a db loaded from its snapshot. Returns the number of entries applied."""
+    path = journal_path(filepath)
+    if not os.path.exists(path):
+        return 0
+
+    applied = 0
+    with open(path, 'r', encoding='utf-8') as file:
+        for line_num, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                entry = codec.loads(line)
+            except json.JSONDecodeError:
+                # A run killed mid-append leaves a torn last line; everything before it is still valid
+                logging.warning(f"Skipping unreadable journal entry at {path}:{line_num}")
+                continue
+            db.setdefault(entry['venue'], {})[entry['id']] = entry['event']
+            applied += 1
+    return applied
+
+def append_journal(region, venue, event_id, record):
+    """Append a single event upsert to the region's journal."""
+    path = journal_path(DB_FILES[region])
+    line = codec.dumps({'venue': venue, 'id': event_id, 'event': record}, pretty=False).decode('utf-8') + '\n'
+    # Start on a fresh line if a previous run was killed halfway through writing an entry
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        with open(path, 'rb') as file:
+            file.seek(-1, os.SEEK_END)
+            if file.read(1) != b'\n':
+                line = '\n' + line
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write(line)
+
+def journal_size(region):
+    """Return (entries, bytes) for the region's journal."""
+    path = journal_path(DB_FILES[region])
+    if not os.path.exists(path):
+        return 0, 0
+    with open(path, 'rb') as file:
+        entries = sum(1 for line in file if line.strip())
+    return entries, os.path.getsize(path)
+
+def compact_db(db, region):
+    """Fold the journal into a new snapshot and start an empty journal."""
+    # The snapshot is replaced atomically before the journal is removed, so a crash in between
+    # only means the (idempotent) journal entries get replayed again on the next load
+    save_db(db, region)
+    path = journal_path(DB_FILES[region])
+    if os.path.exists(path):
+        os.remove(path)
+    logging.info(f"Database journal compacted into {DB_FILES[region]}")
+
+# Shared HTTP session, created on first use so keep-alive connections are reused across scrapers
+_session = None
+_session_lock = threading.Lock()
+# (connect, read) timeout in seconds for every request, changed with set_http_timeout
+_http_timeout = HTTP_TIMEOUT
+# Requests sent per host, compared with the connections each host's pool opened to get reuse stats
+_host_requests = Counter()
+_stats_lock = threading.Lock()
+
+def set_http_timeout(connect=None, read=None):
+    """Override the connect and/or read timeout from HTTP_TIMEOUT for the rest of the run."""
+    global _http_timeout
+    _http_timeout = (connect if connect is not None else _http_timeout[0],
+                     read if read is not None else _http_timeout[1])
+
+class HostLimiter:
+    """Token bucket rate limit for one host, plus a cap on the requests in flight to it.
+
+    The bucket holds up to burst tokens and refills at rate tokens per second; each request
+    takes one, waiting for it if the bucket is empty. A Retry-After from the host pauses the
+    bucket entirely until the requested time.
+    """
+
+    def __init__(self, rate=HOST_RATE, burst=HOST_BURST, max_concurrency=HOST_MAX_CONCURRENCY):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.semaphore = threading.Semaphore(max_concurrency)
+        self.lock = threading.Lock()
+
+    def set_rate(self, rate):
+        with self.lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def pause(self, seconds):
+        """Stop sending requests to the host for the given number of seconds."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def __enter__(self):
+        self.semaphore.acquire()
+        # Reserve a token (the balance may go negative, which queues later callers behind us),
+        # then sleep outside the lock until it is ours
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            wait = max(-self.tokens / self.rate if self.tokens < 0 else 0.0, self.paused_until - now)
+        if wait > 0:
+            time.sleep(wait)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.semaphore.release()
+
+_host_limiters = {}
+
+def get_host_limiter(url):
+    """Return the limiter for a URL's host, creating it (and applying robots.txt Crawl-delay) on first use."""
+    parts = urlsplit(url)
+    with _stats_lock:
+        limiter = _host_limiters.get(parts.hostname)
+        if limiter is not None:
+            return limiter
+        limiter = _host_limiters[parts.hostname] = HostLimiter()
+    # Other threads may use the new limiter at the default rate while robots.txt is being fetched
+    if HONOR_CRAWL_DELAY:
+        crawl_delay = fetch_crawl_delay(f"{parts.scheme}://{parts.netloc}/robots.txt")
+        if crawl_delay and 1 / crawl_delay < limiter.rate:
+            limiter.set_rate(1 / crawl_delay)
+            logging.info(f"Using Crawl-delay of {crawl_delay}s for {parts.hostname}")
+    return limiter
+
+def fetch_crawl_delay(robots_url):
+    """Return the Crawl-delay robots.txt sets for our User-Agent, or None."""
+    try:
+        response = get_session().get(robots_url, timeout=_http_timeout)
+    except requests.RequestException:
+        return None
+    if response.status_code != 200:
+        return None
+    parser = RobotFileParser()
+    parser.parse(response.text.splitlines())
+    try:
+        crawl_delay = parser.crawl_delay(USER_AGENT)
+        return float(crawl_delay) if crawl_delay else None
+    except (TypeError, ValueError):
+        return None
+
+def parse_retry_after(value):
+    """Return the delay in seconds from a Retry-After header (delta-seconds or HTTP-date), or None."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+# Venue being scraped in the current thread, set by main.main so fetch stats can be reported per venue
+current_venue = contextvars.ContextVar('current_venue', default=None)
+
+@contextmanager
+def venue_context(venue):
+    """Attribute every fetch made inside the block to a venue."""
+    token = current_venue.set(venue)
+    try:
+        yield
+    finally:
+        current_venue.reset(token)
+
+class VenueLogBuffer(logging.Handler):
+    """Holds back log records made inside a venue_context until release_venue(venue) passes them on.
+
+    Used while venues are scraped concurrently: it replaces the root logger's handlers for the
+    duration of the with block, and main.main releases each venue's records in registry order
+    so the log reads the same as a sequential run. Records made outside a venue go straight through.
+    """
+
+    def __init__(self, venues):
+        super().__init__()
+        self.buffers = {venue: [] for venue in venues}
+        self.buffer_lock = threading.Lock()
+        self.handlers = []
+
+    def __enter__(self):
+        root = logging.getLogger()
+        self.handlers = root.handlers[:]
+        root.handlers = [self]
+        return self
+
+    def __exit__(self, *exc_info):
+        logging.getLogger().handlers = self.handlers
+        # Don't lose the logs of venues that never got released, e.g. when a scraper raised
+        for venue in list(self.buffers):
+            self.release_venue(venue)
+
+    def emit(self, record):
+        with self.buffer_lock:
+            buffer = self.buffers.get(current_venue.get())
+            if buffer is not None:
+                buffer.append(record)
+                return
+        self._forward(record)
+
+    def release_venue(self, venue):
+        """Pass on everything logged for a venue so far, and anything it logs from now on."""
+        with self.buffer_lock:
+            records = self.buffers.pop(venue, [])
+        for record in records:
+            self._forward(record)
+
+    def _forward(self, record):
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+def resolve_html_parser(name):
+    """Turn 'auto' into 'lxml' if lxml is installed, else 'html.parser'."""
+    if name in (None, 'auto'):
+        return 'lxml' if importlib.util.find_spec('lxml') else 'html.parser'
+    return name
+
+_html_parser = resolve_html_parser(HTML_PARSER)
+
+def set_html_parser(name):
+    """Select the BeautifulSoup tree builder used by fetch_and_parse for the rest of the run."""
+    global _html_parser
+    _html_parser = resolve_html_parser(name)
+
+def get_html_parser():
+    """Return the tree builder for the current venue (HTML_PARSER_OVERRIDES) or the global one."""
+    return resolve_html_parser(HTML_PARSER_OVERRIDES.get(current_venue.get(), _html_parser))
+
+# A fetched page; not_modified is True when the server answered 304 and content came from the cache
+Page = namedtuple('Page', ['url', 'content', 'not_modified'])
+
+# Returned by fetch_and_parse(url, if_modified=True) instead of a soup when the page hasn't changed
+NOT_MODIFIED = object()
+
+class ResponseCache:
+    """On-disk cache of response bodies and their ETag/Last-Modified validators, keyed by URL.
 
-def fetch_and_parse(url):
+    Bodies are stored by content hash under bodies/, the per-URL entries in index.json. A body
+    is deleted once no entry points to it, and save() removes any file under bodies/ the index
+    doesn't reference, so max_bytes bounds what is on disk. Entries younger than ttl seconds
+    are served without a request; older ones are revalidated with a conditional request. Once
+    the bodies pass max_bytes the least recently used entries are evicted. Responses stored
+    during the run are staged per venue and only enter the index when save() is given that
+    venue, which main.main does in prod after the venue's events were written to the dbs. A
+    page answering 304 next run therefore never hides events that a failed venue or a crashed
+    run didn't store.
+    """
+
+    def __init__(self, directory, ttl=0, max_bytes=HTTP_CACHE_MAX_BYTES, read=True):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        # read=False refreshes the cache: every page is downloaded again and stored
+        self.read = read
+        self.index_path = os.path.join(directory, 'index.json')
+        try:
+            self.index = codec.load(self.index_path)
+        except (FileNotFoundError, ValueError):
+            self.index = {}
+        self.lock = threading.Lock()
+        self.dirty = False
+        # url -> (venue, entry) for responses stored this run, not yet committed to the index
+        self.pending = {}
+
+    def _body_path(self, digest):
+        return os.path.join(self.directory, 'bodies', digest[:2], digest)
+
+    def get(self, url):
+        """Return the cache entry for a URL if its body is still on disk, else None."""
+        if not self.read:
+            return None
+        with self.lock:
+            entry = self.pending[url][1] if url in self.pending else self.index.get(url)
+        if entry and os.path.exists(self._body_path(entry['body'])):
+            return entry
+        return None
+
+    def is_fresh(self, entry):
+        """Check if an entry can be used without revalidating it."""
+        return self.ttl > 0 and time.time() - entry['verified_at'] < self.ttl
+
+    def read_body(self, url, entry):
+        with self.lock:
+            entry['used_at'] = time.time()
+            self.dirty = True
+        with open(self._body_path(entry['body']), 'rb') as file:
+            return file.read()
+
+    @staticmethod
+    def conditional_headers(entry):
+        """Build If-None-Match/If-Modified-Since headers from a cache entry."""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url, response):
+        """Keep a 200 response's body, if it has validators or pages are being cached with a TTL."""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified and self.ttl <= 0:
+            return
+        digest = hashlib.sha256(response.content).hexdigest()
+        write_file_atomic(self._body_path(digest), response.content)
+        now = time.time()
+        with self.lock:
+            previous = self.pending.get(url, (None, None))[1]
+            if previous and previous['body'] != digest and not self._referenced(previous['body'], url):
+                self._remove_body(previous['body'])
+            self.pending[url] = (current_venue.get(), {
+                'etag': etag,
+                'last_modified': last_modified,
+                'body': digest,
+                'size': len(response.content),
+                'verified_at': now,
+                'used_at': now,
+            })
+
+    def _referenced(self, digest, url):
+        """Check if any entry other than url's staged one points to a body."""
+        return (any(entry['body'] == digest for entry in self.index.values())
+                or any(entry['body'] == digest for other, (_, entry) in self.pending.items() if other != url))
+
+    def _remove_body(self, digest):
+        try:
+            os.remove(self._body_path(digest))
+        except FileNotFoundError:
+            pass
+
+    def _remove_unreferenced_bodies(self):
+        """Delete body files no index entry points to, left by replaced entries or runs that never saved."""
+        referenced = {entry['body'] for entry in self.index.values()}
+        for root, _, files in os.walk(os.path.join(self.directory, 'bodies')):
+            for name in files:
+                if name not in referenced:
+                    os.remove(os.path.join(root, name))
+
+    def mark_verified(self, url):
+        """Record that the server confirmed the cached body is still current."""
+        with self.lock:
+            if url in self.pending:
+                self.pending[url][1]['verified_at'] = time.time()
+            else:
+                self.index[url]['verified_at'] = time.time()
+                self.dirty = True
+
+    def evict(self):
+        """Drop least recently used entries until the cached bodies fit in max_bytes."""
+        sizes = {entry['body']: entry.get('size', 0) for entry in self.index.values()}
+        total = sum(sizes.values())
+        if total <= self.max_bytes:
+            return
+        for url, entry in sorted(self.index.items(), key=lambda item: item[1].get('used_at', 0)):
+            if total <= self.max_bytes:
+                break
+            del self.index[url]
+            # Bodies are shared by identical pages, only delete one nobody else points to
+            if not any(other['body'] == entry['body'] for other in self.index.values()):
+                total -= sizes[entry['body']]
+                self._remove_body(entry['body'])
+        self.dirty = True
+
+    def save(self, venues=None):
+        """Commit the responses staged for the given venues (all of them by default) and write the index.
+
+        Responses staged for other venues are dropped, so the next run fetches those pages again.
+        """
+        with self.lock:
+            for url, (venue, entry) in self.pending.items():
+                if venues is None or venue in venues:
+                    self.index[url] = entry
+                    self.dirty = True
+            self.pending = {}
+            self.evict()
+            self._remove_unreferenced_bodies()
+            if not self.dirty:
+                return
+            write_file_atomic(self.index_path, codec.dumps(self.index, pretty=False))
+            self.dirty = False
+
+_response_cache = None
+# 'use' reads and writes the cache, 'refresh' ignores what is cached but stores new responses,
+# 'off' disables it; set per run with configure_response_cache
+_cache_mode = 'use'
+_cache_ttl = 0
+# Each environment has its own cache under HTTP_CACHE_DIR, so dev runs (which keep every response for their
+# TTL) never leave validators that make a prod run skip a page whose events were never written
+_cache_dir = HTTP_CACHE_DIR
+# Cache outcomes per venue: 'fresh' (served within the TTL, no request), 'hit' (cached validators sent),
+# 'miss' (nothing cached) and 'not_modified' (server answered 304, cached body used)
+_cache_stats = defaultdict(Counter)
+
+def configure_response_cache(mode='use', ttl=0, env=None):
+    """Set how this run uses the on-disk response cache: 'use', 'refresh', 'off' or 'clear'.
+
+    env selects the environment's own cache directory under HTTP_CACHE_DIR. 'clear' deletes
+    that directory and then behaves like 'use'.
+    """
+    global _response_cache, _cache_mode, _cache_ttl, _cache_dir
+    with _session_lock:
+        _cache_dir = os.path.join(HTTP_CACHE_DIR, env) if HTTP_CACHE_DIR and env else HTTP_CACHE_DIR
+    if HTTP_CACHE_DIR and env:
+        # Drop the cache shared by all environments that older runs kept directly in HTTP_CACHE_DIR
+        for name in ('index.json', 'bodies'):
+            path = os.path.join(HTTP_CACHE_DIR, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            elif os.path.exists(path):
+                os.remove(path)
+    if mode == 'clear':
+        clear_response_cache()
+        mode = 'use'
+    with _session_lock:
+        _response_cache = None
+        _cache_mode = mode
+        _cache_ttl = ttl
+
+def clear_response_cache():
+    if _cache_dir and os.path.exists(_cache_dir):
+        shutil.rmtree(_cache_dir)
+        logging.info(f"Cleared HTTP cache at {_cache_dir}")
+
+def get_response_cache():
+    """Return the shared ResponseCache, or None if it is turned off."""
+    global _response_cache
+    with _session_lock:
+        if _response_cache is None and _cache_dir and _cache_mode != 'off':
+            _response_cache = ResponseCache(_cache_dir, ttl=_cache_ttl, read=(_cache_mode != 'refresh'))
+        return _response_cache
+
+def save_response_cache(venues=None):
+    """Write the response cache, keeping new validators only for the given venues (all by default)."""
+    if _response_cache is not None:
+        _response_cache.save(venues)
+
+def cache_stats():
+    """Return {venue: {'fresh', 'hit', 'miss', 'not_modified'}} for the run so far."""
+    with _stats_lock:
+        return {venue: dict(stats) for venue, stats in _cache_stats.items()}
+
+def log_cache_stats():
+    for venue, stats in cache_stats().items():
+        logging.info(f"HTTP cache for {venue}: {stats.get('fresh', 0)} fresh, {stats.get('hit', 0)} hits, "
+                     f"{stats.get('miss', 0)} misses, {stats.get('not_modified', 0)} not modified")
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of fetching when a venue's circuit breaker is open."""
+
+class CircuitBreaker:
+    """Stops fetching for a venue after threshold consecutive failures, until cooldown seconds pass.
+
+    Only transient errors (see is_transient) count as failures; a 404 still shows the site is up.
+    After the cooldown exactly one request is let through (half-open) while the others are
+    refused: success closes the breaker, another failure opens it again. A probe that never
+    reports back is given up on after another cooldown.
+    """
+
+    def __init__(self, threshold=CIRCUIT_BREAKER_THRESHOLD, cooldown=CIRCUIT_BREAKER_COOLDOWN_S):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        # When the half-open trial request was let through, None while there is none in flight
+        self.probe_started = None
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        with self.lock:
+            state = self.state
+            if state != 'half-open':
+                return state == 'closed'
+            now = time.monotonic()
+            if self.probe_started is not None and now - self.probe_started < self.cooldown:
+                return False
+            self.probe_started = now
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probe_started = None
+
+    def record_failure(self):
+        """Count a failed fetch. Returns True if this failure opened the breaker."""
+        with self.lock:
+            self.failures += 1
+            if self.probe_started is not None or (self.failures >= self.threshold and self.state == 'closed'):
+                self.opened_at = time.monotonic()
+                self.probe_started = None
+                self.times_opened += 1
+                return True
+            return False
+
+_breakers = {}
+# Retried fetch attempts per venue
+_retry_stats = Counter()
+# Pages per venue that couldn't be fetched at all
+_fetch_errors = Counter()
+
+def get_circuit_breaker(key):
+    with _stats_lock:
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker()
+        return _breakers[key]
+
+def fetch_health():
+    """Return {venue: {'retries', 'errors', 'breaker', 'failures', 'times_opened'}} for the run so far."""
+    with _stats_lock:
+        keys = sorted(set(_breakers) | set(_retry_stats) | set(_fetch_errors))
+        return {
+            key: {
+                'retries': _retry_stats[key],
+                'errors': _fetch_errors[key],
+                'breaker': _breakers[key].state if key in _breakers else 'closed',
+                'failures': _breakers[key].failures if key in _breakers else 0,
+                'times_opened': _breakers[key].times_opened if key in _breakers else 0,
+            }
+            for key in keys
+        }
+
+def log_fetch_health():
+    for venue, health in fetch_health().items():
+        if health['retries'] or health['errors'] or health['times_opened']:
+            logging.info(f"Fetch health for {venue}: {health['retries']} retries, {health['errors']} pages failed, "
+                         f"circuit breaker {health['breaker']} (opened {health['times_opened']} times)")
+
+def is_transient(error):
+    """Check if a fetch error is worth retrying."""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    response = getattr(error, 'response', None)
+    return response is not None and response.status_code in HTTP_RETRY_STATUSES
+
+def backoff_delay(attempt):
+    """Jittered exponential backoff before retry number attempt (starting at 0)."""
+    delay = min(HTTP_BACKOFF_BASE_S * 2 ** attempt, HTTP_BACKOFF_MAX_S)
+    return random.uniform(delay / 2, delay)
+
+class ReplayMissError(Exception):
+    """Raised in replay mode when a page was not recorded in the archive."""
+
+class PageArchive:
+    """Zip archive of every page fetched during a run, for replaying the run without the network.
+
+    In 'record' mode pages (and fetch errors) are collected in memory and written, deflate
+    compressed, when the archive is closed. In 'replay' mode pages are served only from the
+    archive and a URL that wasn't recorded raises ReplayMissError.
+    """
+
+    def __init__(self, path, mode):
+        self.path = path
+        self.mode = mode
+        self.lock = threading.Lock()
+        # url -> {'file': name in the zip} or {'error': message}
+        self.index = {}
+        self.pages = {}
+        self.misses = []
+        if mode == 'replay':
+            self.zip = zipfile.ZipFile(path, 'r')
+            self.index = codec.loads(self.zip.read('index.json'))
+
+    def add(self, url, content):
+        name = 'pages/' + hashlib.sha256(url.encode('utf-8')).hexdigest() + '.html'
+        with self.lock:
+            self.index[url] = {'file': name}
+            self.pages[name] = content
+
+    def add_error(self, url, error):
+        with self.lock:
+            self.index[url] = {'error': str(error)}
+
+    def get(self, url):
+        """Return a recorded page's content, re-raising its recorded error if the fetch had failed."""
+        entry = self.index.get(url)
+        if entry is None:
+            with self.lock:
+                self.misses.append(url)
+            raise ReplayMissError(f"{url} is not in the archive {self.path}")
+        if 'error' in entry:
+            raise requests.RequestException(entry['error'])
+        with self.lock:
+            return self.zip.read(entry['file'])
+
+    def close(self):
+        if self.mode == 'replay':
+            self.zip.close()
+            return
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('index.json', codec.dumps(self.index, pretty=True))
+            for name, content in self.pages.items():
+                archive.writestr(name, content)
+        write_file_atomic(self.path, buffer.getvalue())
+        logging.info(f"Recorded {len(self.pages)} pages to {self.path}")
+
+_archive = None
+
+def open_archive(path, mode):
+    """Start recording every fetched page to a zip archive, or replaying pages from one."""
+    global _archive
+    _archive = PageArchive(path, mode)
+    return _archive
+
+def close_archive():
+    """Write (when recording) and close the archive. Raises ReplayMissError if any replayed URL was missing."""
+    global _archive
+    archive, _archive = _archive, None
+    if archive is None:
+        return
+    archive.close()
+    if archive.misses:
+        raise ReplayMissError(f"{len(archive.misses)} pages missing from {archive.path}: {archive.misses}")
+
+def get_session():
+    """Return the shared requests.Session, with per-host connection pools and the bot User-Agent."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            session.headers['User-Agent'] = USER_AGENT
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            for host, pool_size in HTTP_HOST_POOL_SIZES.items():
+                host_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+                session.mount(f'http://{host}/', host_adapter)
+                session.mount(f'https://{host}/', host_adapter)
+            _session = session
+        return _session
+
+def connection_stats():
+    """Return {host: {'requests', 'connections', 'reused'}} for every host fetched so far."""
+    connections = Counter()
+    if _session is not None:
+        for adapter in set(_session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    connections[pool.host] += pool.num_connections
+    return {
+        host: {
+            'requests': count,
+            'connections': connections[host],
+            'reused': max(count - connections[host], 0),
+        }
+        for host, count in sorted(_host_requests.items())
+    }
+
+def log_connection_stats():
+    for host, stats in connection_stats().items():
+        logging.info(f"Connection reuse for {host}: {stats['reused']}/{stats['requests']} requests "
+                     f"on {stats['connections']} connections")
+
+def fetch_page(url):
+    """Fetch a page, revalidating a cached copy with a conditional request when there is one.
+
+    When an archive is open the page is served from it (replay) or added to it (record).
+    Raises requests.RequestException on failure.
+    """
+    archive = _archive
+    if archive is not None and archive.mode == 'replay':
+        try:
+            return Page(url, archive.get(url), False)
+        except ReplayMissError:
+            logging.error(f"Replay miss: {url} is not in {archive.path}")
+            raise
     try:
-        response = requests.get(url, headers={'User-Agent': 'Your Bot 0.1'})
-        response.raise_for_status()
-        return BeautifulSoup(response.content, 'html.parser')
+        page = _fetch_with_retries(url)
+    except requests.RequestException as e:
+        if archive is not None:
+            archive.add_error(url, e)
+        raise
+    if archive is not None:
+        archive.add(url, page.content)
+    return page
+
+def _fetch_with_retries(url):
+    """Fetch a page, retrying transient errors, unless the venue's circuit breaker is open."""
+    venue = current_venue.get() or urlsplit(url).hostname
+    breaker = get_circuit_breaker(venue)
+    if not breaker.allow():
+        raise CircuitOpenError(f"circuit breaker open for {venue}, not fetching")
+
+    attempt = 0
+    while True:
+        try:
+            page = _fetch_page(url)
+        except requests.RequestException as e:
+            if attempt < HTTP_RETRIES and is_transient(e):
+                delay = backoff_delay(attempt)
+                attempt += 1
+                with _stats_lock:
+                    _retry_stats[venue] += 1
+                logging.warning(f"Retrying {url} in {delay:.1f}s (attempt {attempt} of {HTTP_RETRIES}): {e}")
+                time.sleep(delay)
+                continue
+            if not is_transient(e):
+                # The site answered (e.g. a dead link's 404), so it is still up
+                breaker.record_success()
+            elif breaker.record_failure():
+                logging.error(f"Opening circuit breaker for {venue} after {breaker.failures} consecutive failures")
+            raise
+        breaker.record_success()
+        return page
+
+def _fetch_page(url):
+    cache = get_response_cache()
+    entry = cache.get(url) if cache else None
+    venue = current_venue.get() or urlsplit(url).hostname
+
+    # Within the TTL the cached copy is used as is, without contacting the site
+    if entry and cache.is_fresh(entry):
+        with _stats_lock:
+            _cache_stats[venue]['fresh'] += 1
+        return Page(url, cache.read_body(url, entry), False)
+
+    headers = cache.conditional_headers(entry) if entry else {}
+    host = urlsplit(url).hostname
+    with _stats_lock:
+        _host_requests[host] += 1
+        if cache:
+            _cache_stats[venue]['hit' if entry else 'miss'] += 1
+    limiter = get_host_limiter(url)
+    with limiter:
+        response = get_session().get(url, headers=headers, timeout=_http_timeout)
+
+    # Back off from the whole host for as long as it asks
+    if response.status_code in (429, 503):
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        if retry_after is not None:
+            retry_after = min(retry_after, RETRY_AFTER_MAX_S)
+            limiter.pause(retry_after)
+            logging.warning(f"{host} answered {response.status_code}, pausing requests to it for {retry_after:.0f}s")
+
+    if response.status_code == 304 and entry:
+        with _stats_lock:
+            _cache_stats[venue]['not_modified'] += 1
+        cache.mark_verified(url)
+        return Page(url, cache.read_body(url, entry), True)
+
+    response.raise_for_status()
+    if cache:
+        cache.store(url, response)
+    return Page(url, response.content, False)
+
+def fetch_and_parse(url, if_modified=False, parser=None, parse_only=None):
+    """Fetch and parse a page, returning None on errors.
+
+    With if_modified=True, returns NOT_MODIFIED instead of a soup when the server says the
+    page hasn't changed since it was cached, so the caller can skip parsing it altogether.
+    parser overrides the tree builder from get_html_parser for this page. parse_only is a
+    SoupStrainer declaring the region the scraper reads; only matching elements (and everything
+    inside them) are built into the tree, the rest of the document is skipped.
+    """
+    if not url:
+        logging.error(f"Error fetching {url}: no url given")
+        return None
+    try:
+        page = fetch_page(url)
     except requests.RequestException as e:
         logging.error(f"Error fetching {url}: {e}")
+        with _stats_lock:
+            _fetch_errors[current_venue.get() or urlsplit(url).hostname] += 1
         return None
-    
\ No newline at end of file
+    if if_modified and page.not_modified:
+        return NOT_MODIFIED
+    # Imported here so that runs which never parse a page (e.g. phase updates only) don't pay for bs4
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(page.content, parser or get_html_parser(), parse_only=parse_only)
+
+def fetch_many(urls, max_workers=FETCH_MAX_WORKERS, parser=None, parse_only=None):
+    """Fetch and parse several pages concurrently, returning the soups (or None) in the order of urls.
+
+    Each host still gets at most HOST_MAX_CONCURRENCY requests at a time, within its
+    HOST_RATE/HOST_BURST budget, while requests to different hosts proceed in parallel.
+    """
+    urls = list(urls)
+    if not urls:
+        return []
+    venue = current_venue.get()
+
+    def fetch(url):
+        # Context variables don't carry over to pool threads, so pass the venue along explicitly
+        with venue_context(venue):
+            return fetch_and_parse(url, parser=parser, parse_only=parse_only)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as executor:
+        return list(executor.map(fetch, urls))